@@ -0,0 +1,95 @@
+# IMPORTS
+import argparse
+import os
+from Crypto.Cipher import AES
+from Crypto import Random
+from constants import *
+from utils import time
+from utils.crypt import aes
+
+
+# FUNCTIONS
+
+# Legacy encrypt bytes (the chunked implementation before the streaming engine)
+def legacy_encrypt_bytes(key: bytes, data: bytes) -> bytes:
+    data_size = str(len(data)).zfill(16).encode("utf-8")
+    iv = Random.new().read(16)
+    cipher = AES.new(key, AES.MODE_CFB, iv)
+    output = data_size + iv
+    index = 0
+    while True:
+        chunk = data[index:index + AES_CHUNK_SIZE]
+        if len(chunk) == 0:
+            break
+        if len(chunk) % 16 != 0:
+            chunk += b' ' * (16 - (len(chunk) % 16))
+        output += cipher.encrypt(chunk)
+        index += AES_CHUNK_SIZE
+    return output
+
+
+# Legacy decrypt bytes (the chunked implementation before the streaming engine)
+def legacy_decrypt_bytes(key: bytes, data: bytes) -> bytes:
+    output = b''
+    data_size = int(data[0:16])
+    iv = data[16:32]
+    cipher = AES.new(key, AES.MODE_CFB, iv)
+    index = 32
+    while True:
+        chunk = data[index:index + AES_CHUNK_SIZE]
+        if len(chunk) == 0:
+            break
+        output += cipher.decrypt(chunk)
+        index += AES_CHUNK_SIZE
+    output = output[:data_size]
+    return output
+
+
+# Measure
+def measure(function, *args) -> float:
+    start = time.bench_time()
+    function(*args)
+    return time.bench_time() - start
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="AES throughput of the streaming engine against the legacy functions")
+    parser.add_argument("--max-size", type=int, default=256 * 1024 * 1024)
+    parser.add_argument("--legacy-max-size", type=int, default=16 * 1024 * 1024, help="the legacy functions are quadratic, skip them above this size")
+    args = parser.parse_args()
+
+    # Measure every size from 1 KiB up to the maximum size
+    key = aes.get_key("benchmark")
+    size = 1024
+    print(f"{'Size':>10} | {'Encrypt MB/s':>12} | {'Decrypt MB/s':>12} | {'Legacy enc MB/s':>15} | {'Legacy dec MB/s':>15}")
+    while size <= args.max_size:
+        data = os.urandom(size)
+        repeats = max(1, (16 * 1024 * 1024) // size)
+        megabytes = size * repeats / 1e6
+
+        # Streaming engine
+        encrypted = aes.encrypt_bytes(key, data)
+        encrypt = megabytes / sum(measure(aes.encrypt_bytes, key, data) for _ in range(repeats))
+        decrypt = megabytes / sum(measure(aes.decrypt_bytes, key, encrypted) for _ in range(repeats))
+
+        # Legacy functions
+        if size <= args.legacy_max_size:
+            legacy_encrypted = legacy_encrypt_bytes(key, data)
+            legacy_encrypt = f"{megabytes / sum(measure(legacy_encrypt_bytes, key, data) for _ in range(repeats)):15.1f}"
+            legacy_decrypt = f"{megabytes / sum(measure(legacy_decrypt_bytes, key, legacy_encrypted) for _ in range(repeats)):15.1f}"
+        else:
+            legacy_encrypt = legacy_decrypt = f"{'skipped':>15}"
+
+        # Print the results
+        print(f"{size // 1024:>7} KiB | {encrypt:12.1f} | {decrypt:12.1f} | {legacy_encrypt} | {legacy_decrypt}")
+        size *= 4
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,255 @@
+# IMPORTS
+import hmac
+import secrets
+import socket as so
+from constants import *
+from utils import time
+from utils.compression import Compressor
+from utils.crypt import rsa, aes, x25519, ticket
+
+
+# CLASSES
+
+# Benchmark client
+class Client:
+
+    # CONSTRUCTOR
+    def __init__(self, host: str, port: int, private_key: rsa.RSA.RsaKey, timeout: float = 30.0, compression: bool = False) -> None:
+
+        # Set host, port, timeout, the compression request and the client rsa keys
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.compression = compression
+        self.private_key = private_key
+        self.public_key = rsa.generate_public_key(private_key)
+
+        # Define the socket, the session key, the compressor, the resumption ticket and the receive buffer
+        self.socket: so.socket | None = None
+        self.key: bytes | None = None
+        self.compressor: Compressor | None = None
+        self.ticket: bytes | None = None
+        self.buffer = b""
+
+
+    # METHODS
+
+    # Connect
+    def connect(self, control_ver: str = CONTROL_VER) -> float:
+
+        # Open the connection
+        start = time.bench_time()
+        self.socket = so.create_connection((self.host, self.port), self.timeout)
+        self.socket.setsockopt(so.IPPROTO_TCP, so.TCP_NODELAY, 1)
+
+        # Send the first flight without waiting for the server information
+        client_info = self.info(control_ver, self.compression)
+        self.compressor = None
+        if control_ver == CONTROL_VER_PIPELINED:
+            self.handshake_pipelined(client_info)
+            return time.bench_time() - start
+
+        # Exchange the information
+        server_info = self.receive_exactly(128)
+        if control_ver == CONTROL_VER_RESUME:
+            self.handshake_resume(server_info, client_info)
+            return time.bench_time() - start
+        self.socket.sendall(client_info)
+        acknowledgement = self.acknowledge()
+
+        # Run the key exchange and return the handshake duration
+        if control_ver == CONTROL_VER_X25519:
+            self.handshake_x25519(server_info + client_info + acknowledgement)
+        elif control_ver == CONTROL_VER:
+            self.handshake_rsa()
+        return time.bench_time() - start
+
+    # Acknowledge (receives the answer to the requested compression and compresses the session, if it is accepted)
+    def acknowledge(self) -> bytes:
+        if not self.compression:
+            return b""
+        acknowledgement = self.receive_exactly(1)
+        if acknowledgement == CONTROL_OPTION_ACCEPT.encode("utf-8"):
+            self.compressor = Compressor()
+        return acknowledgement
+
+    # Handshake rsa
+    def handshake_rsa(self) -> None:
+
+        # Exchange the rsa keys
+        server_key = rsa.import_key_from_bytes(self.receive_until(b"-----END PUBLIC KEY-----"))
+        self.socket.sendall(rsa.export_key_to_bytes(self.public_key))
+
+        # Receive the aes password and send it back
+        length = int(self.receive_exactly(8))
+        password = rsa.decrypt_bytes(self.private_key, self.receive_exactly(length))
+        encrypted_password = rsa.encrypt_bytes(server_key, password)
+        self.socket.sendall(str(len(encrypted_password)).zfill(8).encode("utf-8") + encrypted_password)
+
+        # Derive the session key
+        self.key = aes.get_key(password.decode("utf-8"))
+
+    # Handshake x25519
+    def handshake_x25519(self, transcript: bytes) -> None:
+
+        # Receive the server keys and send the client ephemeral key
+        server_keys = self.receive_exactly(64)
+        ephemeral_key = x25519.generate_private_key()
+        client_key = x25519.export_public_key_to_bytes(ephemeral_key)
+        self.socket.sendall(client_key)
+
+        # Derive the keys
+        transcript += server_keys + client_key
+        secret = x25519.shared_secret(ephemeral_key, x25519.import_public_key_from_bytes(server_keys[32:])) + x25519.shared_secret(ephemeral_key, x25519.import_public_key_from_bytes(server_keys[:32]))
+        self.key, confirmation_key = x25519.derive_keys(secret, transcript, f"{NAME} {CONTROL_VER_X25519}".encode("utf-8"))
+
+        # Confirm the keys
+        self.confirm(confirmation_key, transcript)
+
+    # Handshake pipelined
+    def handshake_pipelined(self, client_info: bytes) -> None:
+
+        # Send the client information and ephemeral key at once
+        ephemeral_key = x25519.generate_private_key()
+        client_key = x25519.export_public_key_to_bytes(ephemeral_key)
+        self.socket.sendall(client_info + client_key)
+
+        # Receive the server information, the answer to the options and the keys and derive the keys
+        server_info = self.receive_exactly(128)
+        acknowledgement = self.acknowledge()
+        server_keys = self.receive_exactly(64)
+        transcript = server_info + client_info + acknowledgement + client_key + server_keys
+        secret = x25519.shared_secret(ephemeral_key, x25519.import_public_key_from_bytes(server_keys[32:])) + x25519.shared_secret(ephemeral_key, x25519.import_public_key_from_bytes(server_keys[:32]))
+        self.key, confirmation_key = x25519.derive_keys(secret, transcript, f"{NAME} {CONTROL_VER_PIPELINED}".encode("utf-8"))
+
+        # Confirm the keys
+        self.confirm(confirmation_key, transcript)
+
+    # Handshake resume
+    def handshake_resume(self, server_info: bytes, client_info: bytes) -> None:
+
+        # Send the client information, the ticket and the client nonce at once
+        client_nonce = secrets.token_bytes(32)
+        resumption = str(len(self.ticket)).zfill(8).encode("utf-8") + self.ticket + client_nonce
+        self.socket.sendall(client_info + resumption)
+        transcript = server_info + client_info + self.acknowledge() + resumption
+
+        # Fall back to the full x25519 exchange, if the ticket is not accepted
+        if self.receive_exactly(1) == b"0":
+            self.handshake_x25519(transcript + b"0")
+            return
+
+        # Derive the keys
+        server_nonce = self.receive_exactly(32)
+        transcript += b"1" + server_nonce
+        self.key, confirmation_key = x25519.derive_keys(ticket.resumption_secret(self.key), transcript, f"{NAME} {CONTROL_VER_RESUME}".encode("utf-8"))
+        self.confirm(confirmation_key, transcript)
+
+    # Confirm
+    def confirm(self, confirmation_key: bytes, transcript: bytes) -> None:
+
+        # Check the server confirmation and send the client confirmation
+        if not hmac.compare_digest(self.receive_exactly(32), x25519.confirmation_tag(confirmation_key, b"server", transcript)):
+            raise ConnectionError("Invalid server confirmation")
+        self.socket.sendall(x25519.confirmation_tag(confirmation_key, b"client", transcript))
+
+    # Request ticket
+    def request_ticket(self) -> None:
+
+        # Keep the ticket together with the key of this session, the resumption secret is derived from it
+        self.ticket = self.command("ticket")[0]
+
+    # Command
+    def command(self, command: str) -> tuple[bytes, float]:
+
+        # Send the command and wait for the reply
+        start = time.bench_time()
+        self.send(command.encode("utf-8"))
+        reply = self.receive()
+        return reply, time.bench_time() - start
+
+    # Pipeline (sends all commands without waiting and returns the replies in order)
+    def pipeline(self, commands: list[str]) -> list[bytes]:
+        for command in commands:
+            self.send(command.encode("utf-8"))
+        return [self.receive() for _ in commands]
+
+    # Batch (sends all commands in one frame and returns the replies in order)
+    def batch(self, commands: list[str]) -> list[bytes]:
+
+        # Send the batch frame and split the reply frame
+        self.send((CONTROL_BATCH_PREFIX + "\n".join(commands)).encode("utf-8"))
+        data = self.receive()
+        replies, offset = [], 0
+        while offset < len(data):
+            length = int(data[offset:offset + 16])
+            replies.append(data[offset + 16:offset + 16 + length])
+            offset += 16 + length
+        return replies
+
+    # Close
+    def close(self) -> None:
+
+        # Say goodbye and close the socket
+        try:
+            self.send(b"exit")
+        except so.error:
+            pass
+        self.socket.close()
+
+    # Send
+    def send(self, data: bytes) -> None:
+
+        # Send one frame
+        encrypted_data = aes.encrypt_bytes(self.key, self.compressor.compress(data) if self.compressor is not None else data)
+        self.socket.sendall(str(len(encrypted_data)).zfill(16).encode("utf-8") + encrypted_data)
+
+    # Receive
+    def receive(self) -> bytes:
+
+        # Receive one frame
+        length = int(self.receive_exactly(16))
+        data = aes.decrypt_bytes(self.key, self.receive_exactly(length))
+        return self.compressor.decompress(data) if self.compressor is not None else data
+
+    # Receive exactly
+    def receive_exactly(self, size: int) -> bytes:
+
+        # Fill the buffer until the requested size is available
+        while len(self.buffer) < size:
+            chunk = self.socket.recv(65536)
+            if not chunk:
+                raise ConnectionError("Connection closed by the server")
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    # Receive until
+    def receive_until(self, marker: bytes) -> bytes:
+
+        # Fill the buffer until the marker is available
+        while marker not in self.buffer:
+            chunk = self.socket.recv(65536)
+            if not chunk:
+                raise ConnectionError("Connection closed by the server")
+            self.buffer += chunk
+        return self.receive_exactly(self.buffer.index(marker) + len(marker))
+
+
+    # STATIC METHODS
+
+    # Info
+    @staticmethod
+    def info(control_ver: str, compression: bool = False) -> bytes:
+
+        # Build the padded client information with the requested options
+        info = f"Shop Link Control-Benchmark-{control_ver}" + (f"-{CONTROL_OPTION_COMPRESSION}" if compression else "")
+        return (info + " " * (128 - len(info))).encode("utf-8")
+
+
+# FUNCTIONS
+
+# Percentile
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
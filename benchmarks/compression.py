@@ -0,0 +1,111 @@
+# IMPORTS
+import argparse
+import random
+import secrets
+import shutil
+import tempfile
+import zlib
+from constants import *
+from server.server import Server
+from utils import time
+from utils.compression import Compressor
+from utils.crypt import aes
+
+
+# VARIABLES
+
+# Names and categories of the generated items
+NAMES = ("Milk", "Bread", "Apples", "Bananas", "Eggs", "Butter", "Cheese", "Tomatoes", "Potatoes", "Rice", "Pasta", "Coffee", "Orange juice", "Yoghurt", "Chicken breast")
+CATEGORIES = ("fruit", "vegetables", "dairy", "bakery", "meat", "drinks", "frozen", "household", "snacks", "spices")
+
+
+# FUNCTIONS
+
+# Frames (returns the replies of a session, a full sync of the list followed by small deltas)
+def frames(server: Server, rand: random.Random, deltas: int) -> list[bytes]:
+    result = [server.sync(-1)]
+    for _ in range(deltas):
+        revision = server.revision
+        for _ in range(rand.randrange(1, 6)):
+            if rand.random() < 0.5:
+                server.execute(["add", server.shopping_list.next_id, rand.choice(NAMES), rand.choice(CATEGORIES), rand.randrange(1, 6), False, None])
+            else:
+                server.execute(["check", rand.choice(list(server.shopping_list.items)), rand.random() < 0.5])
+        result.append(server.sync(revision))
+    return result
+
+
+# Measure (returns the bytes on the wire, the cpu time per frame on the sender and on the receiver)
+def measure(key: bytes, data: list[bytes], mode: str, level: int, threshold: int) -> tuple[int, float, float]:
+
+    # Compress and encrypt every frame
+    sender, receiver = Compressor(level, threshold), Compressor(level, threshold)
+    start = time.bench_time()
+    encrypted = []
+    for frame in data:
+        match mode:
+            case "raw":
+                encrypted.append(aes.encrypt_bytes(key, frame))
+            case "frame":
+                encrypted.append(aes.encrypt_bytes(key, zlib.compress(frame, level)))
+            case other:
+                encrypted.append(aes.encrypt_bytes(key, sender.compress(frame)))
+    send_time = (time.bench_time() - start) / len(data)
+
+    # Decrypt and decompress every frame
+    start = time.bench_time()
+    for frame in encrypted:
+        match mode:
+            case "raw":
+                aes.decrypt_bytes(key, frame)
+            case "frame":
+                zlib.decompress(aes.decrypt_bytes(key, frame))
+            case other:
+                receiver.decompress(aes.decrypt_bytes(key, frame))
+    receive_time = (time.bench_time() - start) / len(data)
+
+    # Return the results
+    return sum(len(frame) + 16 for frame in encrypted), send_time, receive_time
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Compression ratio and cpu per frame of raw, per frame and streaming compression ahead of aes")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--deltas", type=int, default=500)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--threshold", type=int, default=COMPRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    # Create the list and the replies
+    rand = random.Random(1)
+    path = tempfile.mkdtemp()
+    try:
+        server = Server(f"{path}/list", 0.0, 1000000000)
+        for index in range(args.items):
+            server.execute(["add", index + 1, rand.choice(NAMES), rand.choice(CATEGORIES), rand.randrange(1, 6), rand.random() < 0.3, None])
+        data = frames(server, rand, args.deltas)
+        server.close()
+    finally:
+        shutil.rmtree(path)
+    key = aes.get_key(secrets.token_hex(15))
+
+    # Measure the full sync and the deltas apart, after a warm up
+    measure(key, data, "raw", 0, args.threshold)
+    print(f"Items: {args.items}, full sync: {len(data[0])} bytes, {args.deltas} deltas: {sum(len(frame) for frame in data[1:]) / args.deltas:.0f} bytes on average")
+    for name, part in (("Full sync", data[:1]), ("Deltas", data[1:])):
+        raw_bytes, raw_send, raw_receive = measure(key, part, "raw", 0, args.threshold)
+        print(f"{name}, raw: {raw_bytes} bytes, send {raw_send * 1000000:.1f}us, receive {raw_receive * 1000000:.1f}us per frame")
+        for level in args.levels:
+            for mode, label, threshold in (("frame", "per frame", 0), ("stream", "streaming", args.threshold), ("stream", "streaming without threshold", 0)):
+                wire_bytes, send_time, receive_time = measure(key, part, mode, level, threshold)
+                print(f"{name}, level {level} {label}: {wire_bytes} bytes (ratio {wire_bytes / raw_bytes:.3f}), send {send_time * 1000000:.1f}us, receive {receive_time * 1000000:.1f}us per frame")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,64 @@
+# IMPORTS
+import argparse
+import threading as th
+from benchmarks.client import Client, percentile
+from utils import time
+from utils.crypt import rsa
+
+
+# FUNCTIONS
+
+# Run client
+def run_client(host: str, port: int, private_key: rsa.RSA.RsaKey, timeout: float, commands: int, handshakes: list[float], latencies: list[float], errors: list[str]) -> None:
+    client = Client(host, port, private_key, timeout)
+    try:
+        handshakes.append(client.connect())
+        for _ in range(commands):
+            latencies.append(client.command("ping")[1])
+        client.close()
+    except (OSError, ValueError) as error:
+        errors.append(repr(error))
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Connections/sec and command latency of a running control server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=44445)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--commands", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    # Share one client key, key generation is not part of the measurement
+    private_key = rsa.generate_private_key()
+
+    # Run all clients at once
+    handshakes, latencies, errors = [], [], []
+    threads = [th.Thread(target=run_client, args=(args.host, args.port, private_key, args.timeout, args.commands, handshakes, latencies, errors)) for _ in range(args.clients)]
+    start = time.bench_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.bench_time() - start
+
+    # Print the results
+    print(f"Clients: {args.clients} ({len(errors)} failed), commands per client: {args.commands}")
+    print(f"Total time: {duration:.2f}s")
+    print(f"Connections/sec: {len(handshakes) / duration:.1f}")
+    if handshakes:
+        print(f"Handshake p50/p99: {percentile(handshakes, 0.5) * 1000:.2f}ms / {percentile(handshakes, 0.99) * 1000:.2f}ms")
+    if latencies:
+        print(f"Command p50/p99: {percentile(latencies, 0.5) * 1000:.3f}ms / {percentile(latencies, 0.99) * 1000:.3f}ms")
+    for error in errors[:5]:
+        print(f"Error: {error}")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
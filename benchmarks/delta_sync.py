@@ -0,0 +1,60 @@
+# IMPORTS
+import argparse
+import secrets
+import shutil
+import tempfile
+from server.server import Server
+from utils import time
+from utils.crypt import aes
+
+
+# FUNCTIONS
+
+# Refresh (returns the encrypted bytes on the wire and the server cpu time of one refresh, as done by the sync command)
+def refresh(server: Server, key: bytes, revision: int, repeats: int) -> tuple[int, float]:
+    start = time.bench_time()
+    for _ in range(repeats):
+        data = aes.encrypt_bytes(key, server.sync(revision))
+    return len(data) + 16, (time.bench_time() - start) / repeats
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Bytes on the wire and server cpu per refresh for full lists against deltas")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--changes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    # Create the list
+    path = tempfile.mkdtemp()
+    try:
+        server = Server(f"{path}/list", 0.0, 1000000000)
+        for index in range(args.items):
+            server.execute(["add", index + 1, f"Item number {index}", "fruit", index % 5 + 1, False, None])
+        key = aes.get_key(secrets.token_hex(15))
+
+        # Measure the full list, which is sent to clients without a known revision
+        full_bytes, full_time = refresh(server, key, -1, args.repeats)
+        print(f"Items: {args.items}")
+        print(f"Full list: {full_bytes} bytes, {full_time * 1000:.2f}ms per refresh")
+
+        # Measure the deltas after a few changes
+        for changes in args.changes:
+            revision = server.revision
+            for index in range(changes):
+                server.execute(["check", index % args.items + 1, index % 2 == 0])
+            delta_bytes, delta_time = refresh(server, key, revision, args.repeats)
+            print(f"Delta of {changes} changes: {delta_bytes} bytes ({full_bytes / delta_bytes:.0f}x less), {delta_time * 1000:.3f}ms per refresh ({full_time / delta_time:.0f}x less)")
+        server.close()
+    finally:
+        shutil.rmtree(path)
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
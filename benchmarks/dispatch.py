@@ -0,0 +1,79 @@
+# IMPORTS
+import argparse
+import asyncio
+import threading as th
+from constants import *
+from utils import logging
+from utils import time
+from utils.commands import Registry, Session, CONVERTERS
+
+
+# FUNCTIONS
+
+# Handler (does nothing)
+async def handler(session: Session, *values) -> bytes:
+    return b""
+
+
+# Interpret (parses the arguments by reading the schema on every call)
+def interpret(schema: str, arguments: list[str]) -> tuple:
+    values = []
+    for index, parameter in enumerate(schema.split(), 1):
+        name, _, kind = parameter.strip("[]").partition(":")
+        if kind == "text":
+            values.append(" ".join(arguments[index:]))
+            break
+        if index >= len(arguments):
+            if parameter.startswith("["):
+                values.append(None)
+                continue
+            raise ValueError("Invalid argument count")
+        values.append(CONVERTERS[kind or "str"](arguments[index]) if CONVERTERS[kind or "str"] else arguments[index])
+    return tuple(values)
+
+
+# Run (returns the nanoseconds per dispatched command)
+async def run(registry: Registry, commands: list[str], repeats: int) -> float:
+    session = Session(b"", None)
+    start = time.bench_time_ns()
+    for _ in range(repeats):
+        for command in commands:
+            await registry.run(session, command.split(" "))
+    return (time.bench_time_ns() - start) / (repeats * len(commands))
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Cost of parsing and dispatching commands through the command registry")
+    parser.add_argument("--repeats", type=int, default=100000)
+    args = parser.parse_args()
+
+    # Register the commands
+    schemas = {"sync": "list revision:int", "add": "list category amount:int name:text", "move": "list id:int [before:int]"}
+    commands = ["sync groceries 42", "add groceries fruit 2 Green apples", "move groceries 7"]
+    registry = Registry(logging.Logger(th.Lock(), "Benchmark", LOG_INFO))
+    for name, schema in schemas.items():
+        registry.register(name, handler, schema)
+
+    # Measure the compiled and the interpreted parsers
+    for label, parse in (("Compiled", lambda command: registry.commands[command[0]].parse(command)), ("Interpreted", lambda command: interpret(schemas[command[0]], command))):
+        split_commands = [command.split(" ") for command in commands]
+        start = time.bench_time_ns()
+        for _ in range(args.repeats):
+            for command in split_commands:
+                parse(command)
+        print(f"{label} parser: {(time.bench_time_ns() - start) / (args.repeats * len(commands)):.0f}ns per command")
+
+    # Measure the dispatch with and without a timing hook
+    print(f"Dispatch: {asyncio.run(run(registry, commands, args.repeats)):.0f}ns per command")
+    registry.add_hook(lambda name, duration: None)
+    print(f"Dispatch with a timing hook: {asyncio.run(run(registry, commands, args.repeats)):.0f}ns per command")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,114 @@
+# IMPORTS
+import argparse
+import asyncio
+import json
+import secrets
+import shutil
+import tempfile
+from time import process_time
+from server.broadcast import Broadcaster, Subscriber
+from server.server import Server
+from utils.crypt import aes
+
+
+# CLASSES
+
+# Sink (a connection, that counts the written frames, a stalled sink never drains)
+class Sink:
+
+    # CONSTRUCTOR
+    def __init__(self, stalled: bool = False) -> None:
+        self.stalled = stalled
+        self.compressor = None
+        self.frames = 0
+        self.bytes = 0
+
+    # Write frame
+    def write_frame(self, data: bytes) -> None:
+        self.frames += 1
+        self.bytes += len(data) + 16
+
+    # Drain
+    async def drain(self) -> None:
+        if self.stalled:
+            await asyncio.Event().wait()
+
+
+# FUNCTIONS
+
+# Run broadcast (returns the process cpu time of the changes and the frames and bytes received by one subscriber)
+async def run_broadcast(server: Server, subscribers: int, changes: int, window: float, stalled: Sink) -> tuple[float, int, int]:
+
+    # Subscribe all sessions and one stalled session
+    broadcaster = Broadcaster(window)
+    server.listener = broadcaster.changed
+    sinks = [Sink() for _ in range(subscribers)]
+    for sink in sinks + [stalled]:
+        broadcaster.subscribe(server, Subscriber(aes.get_key(secrets.token_hex(15)), sink, 64))
+
+    # Change the list in bursts of ten changes
+    start = process_time()
+    for index in range(changes):
+        server.execute(["check", index % 100 + 1, index % 2 == 0])
+        await asyncio.sleep(0)
+        if index % 10 == 9:
+            await asyncio.sleep(window * 2)
+    await asyncio.sleep(window * 2)
+    duration = process_time() - start
+    broadcaster.close()
+    server.listener = None
+    return duration, sinks[0].frames, sinks[0].bytes
+
+
+# Run naive (returns the process cpu time of serializing and encrypting every change for every subscriber)
+def run_naive(server: Server, subscribers: int, changes: int) -> float:
+    keys = [aes.get_key(secrets.token_hex(15)) for _ in range(subscribers)]
+    start = process_time()
+    for index in range(changes):
+        server.execute(["check", index % 100 + 1, index % 2 == 0])
+        record = server.journal[-1][1]
+        for key in keys:
+            aes.encrypt_bytes(key, json.dumps({"push": server.name, "revision": server.revision, "changes": [record]}).encode("utf-8"))
+    return process_time() - start
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Cost of pushing list changes to many subscribers with and without coalescing")
+    parser.add_argument("--subscribers", type=int, default=50)
+    parser.add_argument("--changes", type=int, default=1000)
+    parser.add_argument("--window", type=float, default=0.01)
+    args = parser.parse_args()
+
+    # Create the list
+    path = tempfile.mkdtemp()
+    try:
+        server = Server(f"{path}/list", 0.0, 1000000000)
+        for index in range(100):
+            server.execute(["add", index + 1, f"Item {index}", "fruit", 1, False, None])
+
+        # Push every change alone and coalesced within the window, one subscriber never reads
+        stalled = Sink(True)
+        single_time, single_frames, single_bytes = asyncio.run(run_broadcast(server, args.subscribers, args.changes, 0.0, stalled))
+        stalled = Sink(True)
+        coalesced_time, coalesced_frames, coalesced_bytes = asyncio.run(run_broadcast(server, args.subscribers, args.changes, args.window, stalled))
+        naive_time = run_naive(server, args.subscribers, args.changes)
+        server.close()
+    finally:
+        shutil.rmtree(path)
+
+    # Print the results
+    print(f"Subscribers: {args.subscribers} (+1 stalled), changes: {args.changes} in bursts of 10")
+    print(f"Naive, serialized per subscriber: {naive_time * 1000:.1f}ms")
+    print(f"Serialized once, no window: {single_time * 1000:.1f}ms, {single_frames} frames, {single_bytes} bytes per subscriber")
+    print(f"Serialized once, {args.window * 1000:.0f}ms window: {coalesced_time * 1000:.1f}ms, {coalesced_frames} frames, {coalesced_bytes} bytes per subscriber")
+    print(f"Stalled subscriber: {stalled.frames} frames written, the rest was dropped for a resync")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,70 @@
+# IMPORTS
+import argparse
+import threading as th
+from benchmarks.client import Client, percentile
+from constants import *
+from utils import time
+from utils.crypt import rsa
+
+
+# FUNCTIONS
+
+# Run client
+def run_client(host: str, port: int, private_key: rsa.RSA.RsaKey, control_ver: str, count: int, durations: list[float], errors: list[str]) -> None:
+    client = Client(host, port, private_key)
+    try:
+
+        # Get a first ticket with a full handshake
+        if control_ver == CONTROL_VER_RESUME:
+            client.connect(CONTROL_VER_X25519)
+            client.request_ticket()
+            client.close()
+
+        # Measure the handshakes, resumed sessions renew their ticket every time
+        for _ in range(count):
+            durations.append(client.connect(control_ver))
+            if control_ver == CONTROL_VER_RESUME:
+                client.request_ticket()
+            client.close()
+
+    except (OSError, ValueError) as error:
+        errors.append(repr(error))
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Handshakes/sec of a running control server for every key exchange")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=44445)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--handshakes", type=int, default=50, help="handshakes per client")
+    parser.add_argument("--versions", nargs="+", default=[CONTROL_VER, CONTROL_VER_X25519, CONTROL_VER_RESUME, CONTROL_VER_PIPELINED])
+    args = parser.parse_args()
+
+    # Share one client rsa key, key generation is not part of the measurement
+    private_key = rsa.generate_private_key()
+
+    # Measure every control version
+    for control_ver in args.versions:
+        durations, errors = [], []
+        threads = [th.Thread(target=run_client, args=(args.host, args.port, private_key, control_ver, args.handshakes, durations, errors)) for _ in range(args.clients)]
+        start = time.bench_time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.bench_time() - start
+
+        # Print the results
+        print(f"Control version {control_ver}: {len(durations) / duration:.1f} handshakes/sec ({len(errors)} failed)")
+        if durations:
+            print(f"  Handshake p50/p99: {percentile(durations, 0.5) * 1000:.2f}ms / {percentile(durations, 0.99) * 1000:.2f}ms")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
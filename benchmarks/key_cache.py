@@ -0,0 +1,51 @@
+# IMPORTS
+import argparse
+from constants import *
+from utils import time
+from utils.crypt import aes, rsa, worker
+from utils.crypt.keys import KeyCache
+
+
+# FUNCTIONS
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Per-handshake cost of the server key material with and without the key cache")
+    parser.add_argument("--handshakes", type=int, default=500)
+    args = parser.parse_args()
+
+    # Load the server keys, initialize the handshake worker like the pool does and encrypt one password reply
+    keys = KeyCache(f"{KEY_PATH}/private_key.pem", f"{KEY_PATH}/public_key.pem", f"{KEY_PATH}/x25519_private_key.pem")
+    worker.initialize(*keys.worker_args)
+    password = aes.generate_password(30)
+    response = rsa.encrypt_bytes(keys.public_key, password.encode("utf-8"))
+
+    # Uncached: serialize the public key and build a new cipher for every handshake
+    start = time.bench_time()
+    for _ in range(args.handshakes):
+        rsa.export_key_to_bytes(keys.public_key)
+        if rsa.decrypt_bytes(keys.private_key, response).decode("utf-8") == password:
+            aes.get_key(password)
+    uncached = (time.bench_time() - start) / args.handshakes
+
+    # Cached: reuse the serialized public key and the ready-made cipher of the worker, as the server does
+    start = time.bench_time()
+    for _ in range(args.handshakes):
+        keys.refresh()
+        keys.public_key_bytes
+        worker.rsa_response(response, password)
+    cached = (time.bench_time() - start) / args.handshakes
+
+    # Print the results
+    print(f"Uncached: {uncached * 1e6:.1f}us per handshake")
+    print(f"Cached: {cached * 1e6:.1f}us per handshake")
+    print(f"Saving: {(uncached - cached) * 1e6:.1f}us per handshake ({(1 - cached / uncached) * 100:.1f}%)")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,91 @@
+# IMPORTS
+import argparse
+import os
+import subprocess as sp
+import sys
+import threading as th
+from benchmarks.client import Client
+from constants import *
+from utils import time
+from utils.crypt import rsa
+
+
+# FUNCTIONS
+
+# Read output (drains the server output and sets the event, when the server is started)
+def read_output(process: sp.Popen, started: th.Event) -> None:
+    for line in process.stdout:
+        if "Done!" in line:
+            started.set()
+    started.set()
+
+
+# Process stats (returns the cpu seconds and the context switches of all threads, linux only)
+def process_stats(pid: int) -> tuple[float, int]:
+
+    # Read the cpu time
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu_time = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    # Sum up the context switches of all threads
+    switches = 0
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/status") as f:
+                for line in f:
+                    if line.startswith("voluntary_ctxt_switches") or line.startswith("nonvoluntary_ctxt_switches"):
+                        switches += int(line.split()[1])
+        except OSError:
+            pass
+
+    # Return the stats
+    return cpu_time, switches
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Idle cpu usage, wake-ups and shutdown latency of the server (linux only)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=44445)
+    parser.add_argument("--idle", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    # Start the server and wait until it is started
+    process = sp.Popen([sys.executable, "main.py"], cwd=PATH, stdin=sp.DEVNULL, stdout=sp.PIPE, stderr=sp.STDOUT, text=True)
+    started = th.Event()
+    th.Thread(target=read_output, args=(process, started), daemon=True).start()
+    if not started.wait(args.timeout) or process.poll() is not None:
+        process.kill()
+        print("The server did not start!")
+        return
+
+    # Measure the idle server
+    cpu_start, switches_start = process_stats(process.pid)
+    time.sleep(args.idle)
+    cpu_end, switches_end = process_stats(process.pid)
+
+    # Measure the shutdown latency from the stop command to the process exit
+    client = Client(args.host, args.port, rsa.generate_private_key(), args.timeout)
+    client.connect(CONTROL_VER_X25519)
+    start = time.bench_time()
+    client.send(b"stop")
+    process.wait(args.timeout)
+    duration = time.bench_time() - start
+    client.socket.close()
+
+    # Print the results
+    print(f"Idle time: {args.idle:.1f}s")
+    print(f"Idle cpu: {(cpu_end - cpu_start) * 1000:.1f}ms ({(cpu_end - cpu_start) / args.idle * 100:.2f}%)")
+    print(f"Idle wake-ups/sec: {(switches_end - switches_start) / args.idle:.1f}")
+    print(f"Shutdown latency: {duration * 1000:.1f}ms")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
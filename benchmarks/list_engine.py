@@ -0,0 +1,99 @@
+# IMPORTS
+import argparse
+import random
+import tracemalloc
+from server.list import ShoppingList
+from utils import time
+
+
+# VARIABLES
+
+# Categories of the generated items
+CATEGORIES = ("fruit", "vegetables", "dairy", "bakery", "meat", "drinks", "frozen", "household", "snacks", "spices")
+
+
+# FUNCTIONS
+
+# Build (returns the list and the build time)
+def build(count: int) -> tuple[ShoppingList, float]:
+    shopping_list = ShoppingList()
+    start = time.bench_time()
+    for index in range(count):
+        shopping_list.add(f"Item {index}", CATEGORIES[index % len(CATEGORIES)], index % 5 + 1)
+    return shopping_list, time.bench_time() - start
+
+
+# Run mixed (runs random mixed operations, returns the count and duration by operation)
+def run_mixed(shopping_list: ShoppingList, operations: int, seed: int) -> dict[str, list[float]]:
+
+    # Define the random generator, the live ids and the results
+    rand = random.Random(seed)
+    ids = list(shopping_list.items)
+    results = {name: [0, 0.0] for name in ("get", "add", "check", "rename", "move", "remove", "category")}
+
+    # Run the operations
+    for index in range(operations):
+        name = rand.choice(("get", "get", "check", "check", "rename", "move", "add", "remove", "category"))
+        start = time.bench_time()
+        match name:
+            case "get":
+                shopping_list.get(ids[rand.randrange(len(ids))])
+            case "check":
+                shopping_list.check(ids[rand.randrange(len(ids))], rand.random() < 0.5)
+            case "rename":
+                shopping_list.rename(ids[rand.randrange(len(ids))], f"Renamed {index}")
+            case "move":
+                shopping_list.move(ids[rand.randrange(len(ids))], ids[rand.randrange(len(ids))])
+            case "add":
+                ids.append(shopping_list.add(f"New {index}", CATEGORIES[index % len(CATEGORIES)], before=ids[rand.randrange(len(ids))]).id)
+            case "remove":
+                position = rand.randrange(len(ids))
+                ids[position], ids[-1] = ids[-1], ids[position]
+                shopping_list.remove(ids.pop())
+            case "category":
+                shopping_list.in_category(CATEGORIES[index % len(CATEGORIES)])
+        results[name][0] += 1
+        results[name][1] += time.bench_time() - start
+
+    # Return the results
+    return results
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Mixed operations on a shopping list with many items")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Build the list and measure its memory
+    tracemalloc.start()
+    shopping_list, build_time = build(args.items)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Run the mixed operations
+    start = time.bench_time()
+    results = run_mixed(shopping_list, args.operations, args.seed)
+    duration = time.bench_time() - start
+
+    # Check the order against the index
+    count = sum(1 for _ in shopping_list)
+
+    # Print the results
+    print(f"Items: {args.items}, build: {build_time:.3f}s ({build_time / args.items * 1e6:.2f}us per add), memory: {memory / args.items:.0f} bytes per item")
+    print(f"Mixed operations: {args.operations} in {duration:.3f}s ({args.operations / duration:.0f} ops/sec)")
+    for name, (operations, operation_time) in results.items():
+        if operations:
+            print(f"  {name}: {operations} ops, {operation_time / operations * 1e6:.2f}us per op")
+    print(f"Items after: {len(shopping_list)} (ordered: {count})")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
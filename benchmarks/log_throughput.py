@@ -0,0 +1,83 @@
+# IMPORTS
+import argparse
+import sys
+import threading as th
+from constants import *
+from utils import logging
+from utils import time
+
+
+# CLASSES
+
+# Slow stream (emulates the latency of a console or disk write, which releases the GIL like real I/O)
+class SlowStream:
+
+    # CONSTRUCTOR
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    # Write
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+    # Flush
+    def flush(self) -> None:
+        pass
+
+
+# FUNCTIONS
+
+# Run threads
+def run_threads(logger: logging.Logger, threads: int, calls: int) -> float:
+
+    # Log from all threads at once
+    def run() -> None:
+        for index in range(calls):
+            logger.info(f"Command issued: item {index}")
+    workers = [th.Thread(target=run) for _ in range(threads)]
+    start = time.bench_time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.bench_time() - start
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Log calls/sec of the synchronous logger against the background writer")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=20000, help="log calls per thread")
+    parser.add_argument("--write-latency", type=float, default=20.0, help="emulated latency of one console or file write in microseconds")
+    args = parser.parse_args()
+
+    # Replace the console output and the log file with slow streams
+    console = sys.stdout
+    sys.stdout = SlowStream(args.write_latency / 1e6)
+    log_file = SlowStream(args.write_latency / 1e6)
+    lock = th.Lock()
+    total = args.threads * args.calls
+
+    # Synchronous logger
+    duration = run_threads(logging.Logger(lock, "BENCHMARK", LOG_INFO, log_file), args.threads, args.calls)
+    console.write(f"Synchronous logger: {total / duration:,.0f} calls/sec\n")
+
+    # Background writer, the time until the writer caught up counts as well
+    writer = logging.Writer(log_file)
+    writer.start()
+    duration = run_threads(logging.Logger(lock, "BENCHMARK", LOG_INFO, log_file, writer), args.threads, args.calls)
+    console.write(f"Background writer (enqueue only): {total / duration:,.0f} calls/sec\n")
+    start = time.bench_time()
+    writer.close()
+    console.write(f"Background writer (until written): {total / (duration + time.bench_time() - start):,.0f} calls/sec\n")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,56 @@
+# IMPORTS
+import argparse
+import random
+from utils import metrics
+from utils import time
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Recording overhead and accuracy of the metrics")
+    parser.add_argument("--events", type=int, default=1000000)
+    args = parser.parse_args()
+
+    # Measure the empty loop
+    histogram = metrics.Histogram()
+    counter = metrics.Counter()
+    clock = time.bench_time_ns
+    start = clock()
+    for _ in range(args.events):
+        pass
+    empty = clock() - start
+
+    # Measure the recording overhead without the loop
+    start = clock()
+    for _ in range(args.events):
+        histogram.record(123456)
+    print(f"Histogram record: {(clock() - start - empty) / args.events:.0f}ns per event")
+    start = clock()
+    for _ in range(args.events):
+        event_start = clock()
+        histogram.record(clock() - event_start)
+    print(f"Timed histogram record (two clock reads): {(clock() - start - empty) / args.events:.0f}ns per event")
+    start = clock()
+    for _ in range(args.events):
+        counter.value += 1
+    print(f"Counter increment: {(clock() - start - empty) / args.events:.0f}ns per event")
+
+    # Compare the percentiles with the exact ones
+    rand = random.Random(1)
+    values = [int(rand.lognormvariate(12, 1.5)) for _ in range(100000)]
+    histogram = metrics.Histogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for fraction, value in zip((0.5, 0.9, 0.99, 0.999), histogram.percentiles((0.5, 0.9, 0.99, 0.999))):
+        exact = values[max(0, int(len(values) * fraction + 0.5) - 1)]
+        print(f"p{fraction * 100:g}: {value}ns (exact {exact}ns, error {abs(value - exact) / exact * 100:.2f}%)")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,51 @@
+# IMPORTS
+import argparse
+import json
+from benchmarks.client import Client
+from constants import *
+from utils import time
+from utils.crypt import rsa
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Commands/sec of a running control server with one command per round trip, pipelined and batched")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=44445)
+    parser.add_argument("--list", default="benchmark")
+    parser.add_argument("--commands", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=100)
+    args = parser.parse_args()
+
+    # Connect and create the list, if needed
+    client = Client(args.host, args.port, rsa.generate_private_key())
+    client.connect(CONTROL_VER_X25519)
+    client.command(f"create {args.list}")
+
+    # Run the commands, the mutations are durable before their replies are sent
+    for mode in ("sequential", "pipelined", "batched"):
+        revision = json.loads(client.command(f"sync {args.list} -1")[0])["revision"]
+        for kind, command in (("sync", f"sync {args.list} {revision}"), ("add", f"add {args.list} fruit 1 Apples")):
+            start = time.bench_time()
+            for offset in range(0, args.commands, args.depth):
+                commands = [command] * min(args.depth, args.commands - offset)
+                match mode:
+                    case "sequential":
+                        for single in commands:
+                            client.command(single)
+                    case "pipelined":
+                        client.pipeline(commands)
+                    case other:
+                        client.batch(commands)
+            duration = time.bench_time() - start
+            print(f"{mode.capitalize()} {kind}: {args.commands / duration:.0f} commands/sec")
+    client.close()
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
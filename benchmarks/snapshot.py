@@ -0,0 +1,107 @@
+# IMPORTS
+import argparse
+import json
+import random
+import shutil
+import subprocess as sp
+import sys
+import tempfile
+from server.list import ShoppingList
+from server.server import Server
+from utils import file
+from utils import time
+
+
+# VARIABLES
+
+# Categories of the generated items
+CATEGORIES = ("fruit", "vegetables", "dairy", "bakery", "meat", "drinks", "frozen", "household", "snacks", "spices")
+
+
+# FUNCTIONS
+
+# Resident memory (returns the resident set size of this process in bytes, linux only)
+def resident_memory() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+# Create (writes the same list as pretty-printed json and as a list server with a binary snapshot)
+def create(path: str, items: int) -> None:
+    server = Server(f"{path}/server", 0.0, 1000000000)
+    for index in range(items):
+        server.execute(["add", index + 1, f"Item number {index}", CATEGORIES[index % len(CATEGORIES)], index % 5 + 1, index % 3 == 0, None])
+    file.save_json(f"{path}/list.json", {"items": [item.to_dict() for item in server.shopping_list]})
+    server.close()
+
+
+# Measure (runs in a new process, prints the open time, the time for the lookups and the resident memory growth)
+def measure(kind: str, path: str, lookups: int) -> None:
+
+    # Open the list
+    rand = random.Random(1)
+    memory = resident_memory()
+    start = time.bench_time()
+    match kind:
+        case "json":
+            items = {item["id"]: item for item in file.load_json(f"{path}/list.json")["items"]}
+            get = items.get
+        case "json-list":
+            shopping_list = ShoppingList()
+            for item in file.load_json(f"{path}/list.json")["items"]:
+                shopping_list.add(item["name"], item["category"], item["amount"], item["checked"], None, item["id"])
+            get = shopping_list.get
+        case "binary":
+            server = Server(f"{path}/server")
+            get = server.item
+        case other:
+            server = Server(f"{path}/server")
+            server.shopping_list
+            get = server.shopping_list.get
+    open_time = time.bench_time() - start
+    open_memory = resident_memory() - memory
+    count = len(items) if kind == "json" else (len(shopping_list) if kind == "json-list" else server.count())
+
+    # Look up random items
+    start = time.bench_time()
+    for _ in range(lookups):
+        get(rand.randrange(1, count + 1))
+    lookup_time = time.bench_time() - start
+
+    # Print the results
+    print(json.dumps([open_time, open_memory, lookup_time, resident_memory() - memory]))
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Open time and resident memory of json files against memory mapped binary snapshots (linux only)")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--measure", nargs=2)
+    args = parser.parse_args()
+
+    # Measure in this process, if started as a measurement
+    if args.measure:
+        measure(args.measure[0], args.measure[1], args.lookups)
+        return
+
+    # Create the files and measure every kind in a new process
+    path = tempfile.mkdtemp()
+    try:
+        create(path, args.items)
+        print(f"Items: {args.items}, json: {file.file_size(f'{path}/list.json') / 1048576:.1f} MiB, snapshot: {file.file_size(f'{path}/server/snapshot.bin') / 1048576:.1f} MiB")
+        for kind, name in (("json", "JSON to dicts"), ("json-list", "JSON to list"), ("binary", "Binary mmap"), ("binary-list", "Binary to list")):
+            output = sp.run([sys.executable, "-m", "benchmarks.snapshot", "--lookups", str(args.lookups), "--measure", kind, path], capture_output=True, text=True, check=True).stdout
+            open_time, open_memory, lookup_time, memory = json.loads(output)
+            print(f"{name}: open {open_time * 1000:.2f}ms (+{open_memory / 1048576:.1f} MiB resident), {args.lookups} lookups {lookup_time * 1000:.2f}ms (+{memory / 1048576:.1f} MiB resident in total)")
+    finally:
+        shutil.rmtree(path)
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
@@ -0,0 +1,96 @@
+# IMPORTS
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from server.list import ShoppingList
+from server.server import Server
+from utils import file
+from utils import time
+
+
+# FUNCTIONS
+
+# Run writer (toggles items and waits until every write is durable)
+async def run_writer(server: Server, ids: list[int], writes: int, offset: int) -> None:
+    for index in range(writes):
+        await asyncio.wrap_future(server.execute(["check", ids[(offset + index * 7919) % len(ids)], index % 2 == 0]))
+
+
+# Run wal (returns the durable writes/sec and the group commits)
+async def run_wal(path: str, items: int, writers: int, writes: int, commit_delay: float) -> tuple[float, int]:
+
+    # Create the list
+    server = Server(path, commit_delay, 1000000000)
+    for index in range(items):
+        server.execute(["add", server.shopping_list.next_id, f"Item {index}", "fruit", 1, False, None])
+    server.snapshot().result()
+    ids = list(server.shopping_list.items)
+    commits = server.wal.commits
+
+    # Run all writers at once
+    start = time.bench_time()
+    await asyncio.gather(*(run_writer(server, ids, writes, writer) for writer in range(writers)))
+    duration = time.bench_time() - start
+    commits = server.wal.commits - commits
+    server.close()
+
+    # Return the results
+    return writers * writes / duration, commits
+
+
+# Run json (returns the durable writes/sec of rewriting the whole list as pretty-printed json for every write)
+def run_json(path: str, items: int, writes: int) -> float:
+
+    # Create the list
+    shopping_list = ShoppingList()
+    for index in range(items):
+        shopping_list.add(f"Item {index}", "fruit")
+    ids = list(shopping_list.items)
+
+    # Rewrite and sync the whole file for every write
+    start = time.bench_time()
+    for index in range(writes):
+        shopping_list.check(ids[(index * 7919) % len(ids)], index % 2 == 0)
+        with file.open_text(f"{path}/list.json", "w") as f:
+            json.dump({"items": [item.to_dict() for item in shopping_list]}, f, indent=4, separators=(", ", ": "))
+            f.flush()
+            os.fsync(f.fileno())
+    return writes / (time.bench_time() - start)
+
+
+# Main
+def main() -> None:
+
+    # Read arguments
+    parser = argparse.ArgumentParser(description="Durable writes/sec of the write-ahead log against a full json rewrite")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--json-writes", type=int, default=50)
+    parser.add_argument("--commit-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    # Run the benchmarks in a temporary directory
+    path = tempfile.mkdtemp()
+    try:
+        wal_rate, commits = asyncio.run(run_wal(f"{path}/wal", args.items, args.writers, args.writes, args.commit_delay))
+        single_rate, _ = asyncio.run(run_wal(f"{path}/single", args.items, 1, args.writes, 0.0))
+        json_rate = run_json(path, args.items, args.json_writes)
+    finally:
+        shutil.rmtree(path)
+
+    # Print the results
+    print(f"Items: {args.items}")
+    print(f"WAL, {args.writers} writers: {wal_rate:.0f} durable writes/sec ({args.writers * args.writes / max(commits, 1):.1f} records per group commit)")
+    print(f"WAL, 1 writer: {single_rate:.0f} durable writes/sec")
+    print(f"JSON rewrite: {json_rate:.1f} durable writes/sec")
+
+
+# MAIN
+if __name__ == '__main__':
+
+    # Call main function
+    main()
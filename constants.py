@@ -22,6 +22,12 @@ LOG_LEVEL_NAMES = {
     LOG_WARNING: "WARNING",
     LOG_ERROR: "ERROR",
 }
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 1024
+LOG_ROTATE_SIZE = 10485760
+LOG_ROTATE_INTERVAL = 86400.0
+LOG_RETAIN_FILES = 10
+LOG_RETAIN_SIZE = 104857600
 
 # Paths
 PATH = os.path.dirname(__file__)
@@ -30,9 +36,65 @@ SERVER_PATH = f"{DATA_PATH}/servers"
 LOG_PATH = f"{DATA_PATH}/logs"
 CONFIG_PATH = f"{DATA_PATH}/configs"
 KEY_PATH = f"{DATA_PATH}/keys"
+METRICS_PATH = f"{DATA_PATH}/metrics.json"
+PROFILE_PATH = f"{DATA_PATH}/profiles"
+
+# Metrics
+METRICS_PRECISION = 7
+
+# Profiling
+PROFILE_MEMORY_LIMIT = 50
+PROFILE_MEMORY_FRAMES_MAX = 65535
+
+# Keys
+KEY_CHECK_INTERVAL = 1.0
 
 # AES
 AES_CHUNK_SIZE = 32768
+AES_HEADER_SIZE = 32
+AES_CTR_MAGIC = b"SLAESCTR"
+AES_CTR_HEADER_SIZE = 24
+AES_REGION_SIZE = 16777216
+
+# Write-ahead log
+WAL_COMMIT_DELAY = 0.002
+WAL_SNAPSHOT_MAGIC = b"SLSN"
+WAL_SNAPSHOT_VER = 2
+WAL_SNAPSHOT_HEADER_SIZE = 14
+WAL_SNAPSHOT_RECORDS = 10000
+
+# Snapshots
+SNAPSHOT_MAGIC = b"SLLS"
+SNAPSHOT_VER = 2
+
+# Lists
+LIST_BASE_SIZE = 65536
+LIST_ITEM_SIZE = 320
+LIST_JOURNAL_SIZE = 4096
+LIST_AMOUNT_MIN = -2147483648
+LIST_AMOUNT_MAX = 2147483647
+LIST_NAME_PATTERN = r"[A-Za-z0-9_\-]{1,64}"
+MANAGER_MEMORY_BUDGET = 268435456
+MANAGER_MAX_OPEN = 1024
+MANAGER_IDLE_TIME = 600.0
+BROADCAST_WINDOW = 0.05
+BROADCAST_QUEUE_SIZE = 64
 
 # Control
 CONTROL_VER = "1.0"
+CONTROL_VER_X25519 = "1.1"
+CONTROL_VER_RESUME = "1.2"
+CONTROL_VER_PIPELINED = "1.3"
+CONTROL_TICKET_MAX_SIZE = 1024
+CONTROL_FRAME_HEADER_SIZE = 16
+CONTROL_BUFFER_SIZE = 65536
+CONTROL_MAX_FRAME_SIZE = 16777216
+CONTROL_HANDOVER_ENV = "SHOP_LINK_HANDOVER"
+CONTROL_OPTION_COMPRESSION = "z"
+CONTROL_OPTION_ACCEPT = "+"
+CONTROL_OPTION_DECLINE = "-"
+CONTROL_BATCH_PREFIX = "batch\n"
+
+# Compression
+COMPRESSION_LEVEL = 6
+COMPRESSION_THRESHOLD = 64
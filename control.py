@@ -1,10 +1,29 @@
 # IMPORTS
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import hmac
+import json
+import math
+import multiprocessing as mp
+import os
+import secrets
 import socket as so
+import sys
+import threading as th
 from constants import *
 from main import Server
+from server.broadcast import Broadcaster, Subscriber
+from server.commands import ListCommands
 from utils import logging
+from utils import handover
+from utils import metrics
+from utils import time
+from utils.commands import Registry, Session
+from utils.compression import Compressor
+from utils.connection import Connection
+from utils.profiling import Profiler
 from utils.thread import Thread
-from utils.crypt import rsa, aes
+from utils.crypt import aes, x25519, ticket, worker
 
 
 # CLASSES
@@ -19,7 +38,7 @@ class Control(Thread):
         Thread.__init__(self, server, name="Control Thread", daemon=True)
 
         # Define the logger
-        self.logger = logging.Logger(self.server.lock, f"{NAME} - CONTROL", LOG_DEBUG if self.server.debug else LOG_INFO, self.server.log_file)
+        self.logger = logging.Logger(self.server.lock, f"{NAME} - CONTROL", LOG_DEBUG if self.server.debug else LOG_INFO, self.server.log_file, self.server.log_writer, self.server.json_lines)
 
         # Load the ip
         self.logger.debug("Load ip ...")
@@ -85,14 +104,119 @@ class Control(Thread):
         else:
             self.port = self.server.control_config.data["port"]
 
-        # Define the socket
-        self.logger.debug("Define socket ...")
-        self.socket = so.socket(so.AF_INET, so.SOCK_STREAM)
-        self.socket.settimeout(0.5)
+        # Load the backlog, handshake timeout and maximum frame size
+        self.backlog = self.server.control_config.data.setdefault("backlog", 128)
+        self.handshake_timeout = self.server.control_config.data.setdefault("handshake_timeout", 10.0)
+        self.max_frame_size = self.server.control_config.data.setdefault("max_frame_size", CONTROL_MAX_FRAME_SIZE)
+
+        # Load the graceful restart timeouts
+        self.restart_timeout = self.server.control_config.data.setdefault("restart_timeout", 10.0)
+        self.drain_timeout = self.server.control_config.data.setdefault("drain_timeout", 30.0)
+
+        # Load the push window and the push queue size of every subscriber
+        self.push_window = self.server.control_config.data.setdefault("push_window", BROADCAST_WINDOW)
+        self.push_queue_size = self.server.control_config.data.setdefault("push_queue_size", BROADCAST_QUEUE_SIZE)
+
+        # Load the compression, which is used for sessions of clients asking for it
+        self.compression = self.server.control_config.data.setdefault("compression", True)
+        self.compression_level = self.server.control_config.data.setdefault("compression_level", COMPRESSION_LEVEL)
+        self.compression_threshold = self.server.control_config.data.setdefault("compression_threshold", COMPRESSION_THRESHOLD)
+
+        # Load the interval of the metrics dump, the metrics are not dumped, if it is zero
+        self.metrics_interval = self.server.control_config.data.setdefault("metrics_interval", 0.0)
+
+        # Load the handshake pool type, size and queue depth
+        self.pool_type = self.server.control_config.data.setdefault("handshake_pool_type", "process")
+        self.pool_size = self.server.control_config.data.setdefault("handshake_pool_size", os.cpu_count() or 1)
+        self.queue_depth = self.server.control_config.data.setdefault("handshake_queue_depth", 256)
+
+        # Define the handshake pool and the count of pending handshakes
+        self.pool: Executor | None = None
+        self.pending_handshakes = 0
+
+        # Define the resumption tickets, the ticket keys of the old process are kept after a graceful restart
+        self.tickets = ticket.Tickets(self.server.control_config.data.setdefault("ticket_lifetime", 86400.0), self.server.control_config.data.setdefault("ticket_rotation", 3600.0))
+        if self.server.handover:
+            self.tickets.load(self.server.handover["tickets"])
+
+        # Define the server information, the options are only answered to clients asking for them
+        info = f"{NAME}-{VERSION}-{CONTROL_VER}"
+        self.server_info = (info + " " * (128 - len(info))).encode("utf-8")
+
+        # Define the key exchanges by control version
+        self.handshakes = {
+            CONTROL_VER: self.handshake_rsa,
+            CONTROL_VER_X25519: self.handshake_x25519,
+            CONTROL_VER_RESUME: self.handshake_resume,
+            CONTROL_VER_PIPELINED: self.handshake_pipelined,
+        }
+
+        # Define the broadcaster, which is told about every change of the lists
+        self.broadcaster = Broadcaster(self.push_window)
+        self.server.manager.listener = self.broadcaster.changed
+
+        # Define the command registry, the control and the list commands register into it, the commands ending sessions run alone, but do not block the list changes
+        self.registry = Registry(self.logger)
+        self.registry.register("stop", self.command_stop, sequential=True)
+        self.registry.register("exit", self.command_exit, sequential=True)
+        self.registry.register("restart", self.command_restart, sequential=True)
+        self.registry.register("ticket", self.command_ticket)
+        self.registry.register("stats", self.command_stats)
+        self.registry.register("profile", self.command_profile, "action [argument]")
+        self.registry.register("memory", self.command_memory, "action [frames:int]")
+        self.registry.register("stacks", self.command_stacks)
+        ListCommands(self.server.manager, self.broadcaster).register(self.registry)
+
+        # Define the metrics of the handshakes and the commands, the commands are timed by a hook of the registry
+        self.handshake_time = metrics.histogram("handshake")
+        self.handshake_info_time = metrics.histogram("handshake.info")
+        self.handshake_exchange_times = {control_ver: metrics.histogram(f"handshake.exchange.{control_ver}") for control_ver in self.handshakes}
+        self.connections = metrics.counter("connections")
+        self.failed_handshakes = metrics.counter("handshakes.failed")
+        self.command_times = {name: metrics.histogram(f"command.{name}") for name in self.registry.commands}
+        self.registry.add_hook(self.record_command)
+        self.started_at = time.bench_time()
+
+        # Define the profiler, which hooks nothing until a profile or the memory tracing is started
+        self.profiler = Profiler(self.logger)
+
+        # Define the listener, the sessions and the restart state
+        self.listener: asyncio.Server | None = None
+        self.sessions: set[asyncio.Task] = set()
+        self.clients: dict[str, Session] = {}
+        self.restarting = False
+        self.draining = False
+
+        # Define the event loop, the exit waiter and the started and exit events
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.exit_waiter: asyncio.Future | None = None
+        self.started = th.Event()
+        self.exit_event = th.Event()
+
+
+    # PROPERTIES
+
+    # Exit (setting it wakes up the event loop from any thread)
+    @property
+    def exit(self) -> bool:
+        return self.exit_event.is_set()
+
+    @exit.setter
+    def exit(self, value: bool) -> None:
+
+        # Clear the exit event
+        if not value:
+            self.exit_event.clear()
+            return
 
-        # Define started and exit variable
-        self.started = False
-        self.exit = False
+        # Set the exit event and wake up the listener
+        self.exit_event.set()
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.wake_up)
+            except RuntimeError:
+                pass
 
 
     # METHODS
@@ -100,188 +224,696 @@ class Control(Thread):
     # Main
     def main(self) -> None:
 
+        # Run the event loop, the server is woken up even if it fails to start
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.started.set()
+
+    # Serve
+    async def serve(self) -> None:
+
+        # Set the event loop
+        self.loop = asyncio.get_running_loop()
+
+        # Start the handshake pool
+        self.start_pool()
+
+        # Take over the listening socket of the old process, if it is still bound to the configured address
+        if self.server.handover:
+            sock = so.socket(fileno=self.server.handover["listen_fd"])
+            if sock.getsockname()[:2] == (self.ip, self.port):
+                self.logger.debug("Take over the listening socket ...")
+                self.listener = await self.loop.create_server(lambda: Connection(self.handle_connection, self.max_frame_size), sock=sock, backlog=self.backlog)
+            else:
+                self.logger.info("The IP or port changed! Bind a new socket ...")
+                sock.close()
+
         # Bind the socket
         try:
-            self.logger.debug("Bind the socket ...")
-            self.socket.bind((self.ip, self.port))
-            self.logger.debug("Socket successfully bound.")
+            if self.listener is None:
+                self.logger.debug("Bind the socket ...")
+                self.listener = await self.loop.create_server(lambda: Connection(self.handle_connection, self.max_frame_size), self.ip, self.port, backlog=self.backlog, reuse_address=True)
+                self.logger.debug("Socket successfully bound.")
         except (so.error, OverflowError):
-            self.logger.error(f"The current IP ({self.ip}) or port ({self.port}) is not available or invalid!")
+            self.logger.error("The current IP ({}) or port ({}) is not available or invalid!", self.ip, self.port)
             self.logger.error("Please restart the server and specify another IP or port!")
             self.server.control_config.data.pop("port")
             self.server.control_config.data.pop("ip")
             self.server.exit = True
-            self.started = True
+            self.started.set()
+            self.pool.shutdown(cancel_futures=True)
             return
 
         # Log info
         self.logger.info("The control server is running on:")
-        self.logger.info(f"IP: {self.ip}")
-        self.logger.info(f"Port: {self.port}")
+        self.logger.info("IP: {}", self.ip)
+        self.logger.info("Port: {}", self.port)
 
-        # Set started to true
-        self.started = True
+        # Set started and tell the old process, that this one is listening
+        self.started.set()
+        if self.server.handover:
+            handover.ready(self.server.handover["ready_fd"])
+
+        # Dump the metrics periodically, if enabled
+        dump_task = self.loop.create_task(self.dump_metrics()) if self.metrics_interval > 0 else None
 
         # Listen
-        self.listen()
+        await self.listen()
 
         # Close the socket
-        self.socket.close()
+        self.listener.close()
         self.logger.debug("Closed socket.")
 
+        # Drain the open sessions after a graceful restart, every session finishes its current command
+        if self.draining and self.sessions:
+            self.logger.info("Drain {} open sessions ...", len(self.sessions))
+            await asyncio.wait(tuple(self.sessions), timeout=self.drain_timeout)
+
+        # Cancel all open sessions
+        for session in tuple(self.sessions):
+            session.cancel()
+        if self.sessions:
+            await asyncio.gather(*self.sessions, return_exceptions=True)
+
+        # Stop the broadcaster and the metrics dump, the metrics are dumped a last time
+        self.broadcaster.close()
+        if dump_task is not None:
+            dump_task.cancel()
+            await asyncio.gather(dump_task, return_exceptions=True)
+            await self.loop.run_in_executor(None, metrics.dump, METRICS_PATH, self.stats())
+
+        # Write a running profile and stop the memory tracing
+        self.profiler.stop()
+        self.profiler.stop_memory()
+
+        # Stop the handshake pool
+        self.pool.shutdown(cancel_futures=True)
+        self.logger.debug("Stopped handshake pool.")
+
     # Listen
-    def listen(self):
+    async def listen(self) -> None:
 
         # Log info
-        self.logger.debug("Start listening for a client ...")
-        self.socket.listen(1)
+        self.logger.debug("Start listening for clients ...")
 
-        # Listening loop
-        while not self.exit:
+        # Wait for exit, while the sessions are served by their own tasks
+        self.exit_waiter = self.loop.create_future()
+        if not self.exit:
+            await self.exit_waiter
 
-            # Try to accept a client
-            try:
-                client, (ip, port) = self.socket.accept()
-            except so.timeout:
-                continue
+        # Log info
+        self.logger.debug("Stopped listening for clients.")
+
+    # Wake up (runs in the event loop)
+    def wake_up(self) -> None:
+        if self.exit_waiter is not None and not self.exit_waiter.done():
+            self.exit_waiter.set_result(None)
+
+    # Restart (hands the listening socket to a new process, which accepts all new clients, while this one drains its sessions)
+    async def restart(self) -> bool:
+
+        # Check for a running restart
+        if self.restarting:
+            return False
+        self.restarting = True
+
+        # Start the new process with the listening socket, the ticket keys and the current log file
+        self.logger.info("Restart gracefully ...")
+        try:
+            process, ready_fd = handover.start(sys.argv, self.listener.sockets[0].fileno(), {"tickets": self.tickets.export(), "log_file": getattr(self.server.log_file, "path", "")})
+        except OSError as error:
+            self.logger.error("Cannot start the new process! {}", error)
+            self.restarting = False
+            return False
+
+        # Wait until the new process is listening, the pipe is closed without data, if it failed
+        ready = self.loop.create_future()
+        self.loop.add_reader(ready_fd, lambda: ready.done() or ready.set_result(os.read(ready_fd, 1)))
+        try:
+            started = await asyncio.wait_for(ready, self.restart_timeout) == b"1"
+        except asyncio.TimeoutError:
+            started = False
+        finally:
+            self.loop.remove_reader(ready_fd)
+            os.close(ready_fd)
+
+        # Keep serving, if the new process failed
+        if not started:
+            self.logger.error("The new process failed to start! Keep running ...")
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            self.restarting = False
+            return False
+
+        # Stop accepting clients and running new commands, close the idle sessions, hand the lists to the new process and drain the busy sessions
+        self.logger.info("The new process (PID: {}) is listening! Drain and quit ...", process.pid)
+        self.listener.close()
+        self.draining = True
+        self.exit = True
+        self.server.exit = True
+        for session in tuple(self.clients.values()):
+            if session.idle and session.task is not None:
+                session.task.cancel()
+        await self.server.manager.shutdown()
+        return True
+
+    # Handle connection
+    async def handle_connection(self, connection: Connection) -> None:
+
+        # Register the session
+        session = asyncio.current_task()
+        self.sessions.add(session)
+
+        # Get the address
+        ip, port = connection.ip, connection.port
+
+        try:
 
             # Log info
-            self.logger.info(f"New control client connection from {ip}:{port}! Initialize ...")
+            self.logger.info("New control client connection from {}:{}! Initialize ...", ip, port)
 
-            # Send server information
+            # Run the handshake
+            self.connections.value += 1
+            start = time.bench_time_ns()
             try:
-                server_info = f"{NAME}-{VERSION}-{CONTROL_VER}" + " " * (128 - len(f"{NAME}-{VERSION}-{CONTROL_VER}"))
-                client.send(server_info.encode("utf-8"))
-            except so.error:
-                self.logger.info(f"Server connection {ip}:{port} failed! Connection closed ...")
-                client.close()
-                continue
+                key = await asyncio.wait_for(self.handshake(connection, ip, port), self.handshake_timeout)
+            except asyncio.TimeoutError:
+                self.logger.info("Client connection {}:{} failed! Handshake timed out ...", ip, port)
+                key = None
+            if key is None:
+                self.failed_handshakes.value += 1
+            else:
+                self.handshake_time.record(time.bench_time_ns() - start)
 
-            # Receive client information
-            try:
-                client_info = client.recv(128).decode("utf-8")
-                name, version, control_ver = client_info.strip().split("-")
-            except (so.error, UnicodeDecodeError):
-                self.logger.info(f"Client connection {ip}:{port} failed! Invalid response ...")
-                client.close()
-                continue
-
-            # Check client information
-            if name != "Shop Link Control":
-                self.logger.info(f"Client connection {ip}:{port} failed! Invalid client ...")
-                client.close()
-                continue
-            if control_ver != CONTROL_VER:
-                self.logger.info(f"Client connection {ip}:{port} failed! Invalid version ...")
-                client.close()
-                continue
-
-            # Send the server public rsa key
-            try:
-                client.send(rsa.export_key_to_bytes(self.server.public_key))
-            except so.error:
-                self.logger.info(f"Server connection {ip}:{port} failed! Connection closed ...")
-                client.close()
-                continue
+            # Start handling
+            if key is not None:
+                await self.handle_client(key, connection, ip, port)
 
-            # Receive the client public rsa key
-            try:
-                client_key = rsa.import_key_from_bytes(client.recv(2048))
-            except so.error:
-                self.logger.info(f"Client connection {ip}:{port} failed! Invalid key ...")
-                client.close()
-                continue
+        finally:
+
+            # Close the connection and unregister the session
+            connection.close()
+            self.sessions.discard(session)
 
-            # Generate a new aes password
-            password = aes.generate_password(30)
+    # Start pool
+    def start_pool(self) -> None:
+
+        # Log info
+        self.logger.debug("Start the handshake pool ({}, {} workers) ...", self.pool_type, self.pool_size)
+
+        # Start a new pool with the current keys
+        if self.pool_type == "process":
+            self.pool = ProcessPoolExecutor(self.pool_size, mp.get_context("spawn"), initializer=worker.initialize, initargs=self.server.keys.worker_args)
+        else:
+            self.pool = ThreadPoolExecutor(self.pool_size, "Handshake Worker", initializer=worker.initialize, initargs=self.server.keys.worker_args)
+
+    # Restart pool (replaces the pool, the running jobs of the old one still finish)
+    def restart_pool(self) -> None:
+        self.pool.shutdown(wait=False)
+        self.start_pool()
+
+    # Handshake
+    async def handshake(self, connection: Connection, ip: str, port: int) -> bytes | None:
+
+        # Send server information
+        start = time.bench_time_ns()
+        try:
+            server_info = self.server_info
+            connection.write(server_info)
+            await connection.drain()
+        except so.error:
+            self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+            return None
 
-            # Send the aes password
+        # Receive client information
+        try:
+            client_info = bytes(await connection.read_exactly(128))
+            name, version, control_ver, *options = client_info.decode("utf-8").strip().split("-")
+        except (so.error, asyncio.IncompleteReadError, UnicodeDecodeError, ValueError):
+            self.logger.info("Client connection {}:{} failed! Invalid response ...", ip, port)
+            return None
+
+        # Check client information
+        if name != "Shop Link Control":
+            self.logger.info("Client connection {}:{} failed! Invalid client ...", ip, port)
+            return None
+        if control_ver not in self.handshakes:
+            self.logger.info("Client connection {}:{} failed! Invalid version ...", ip, port)
+            return None
+
+        # Reject the client, if too many handshakes are waiting for the pool
+        if self.pending_handshakes >= self.queue_depth:
+            self.logger.info("Client connection {}:{} failed! Server busy ...", ip, port)
+            return None
+
+        # Answer a requested compression, clients without options get no answer, so their handshake is unchanged
+        acknowledgement = b""
+        if CONTROL_OPTION_COMPRESSION in options:
+            acknowledgement = (CONTROL_OPTION_ACCEPT if self.compression else CONTROL_OPTION_DECLINE).encode("utf-8")
             try:
-                encrypted_password = rsa.encrypt_bytes(client_key, password.encode("utf-8"))
-                client.send(str(len(encrypted_password)).zfill(8).encode("utf-8"))
-                client.send(encrypted_password)
+                connection.write(acknowledgement)
             except so.error:
-                self.logger.info(f"Server connection {ip}:{port} failed! Connection closed ...")
-                client.close()
-                continue
+                self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+                return None
+
+        # Restart the handshake pool, if the server keys changed
+        if self.server.keys.refresh():
+            self.logger.info("Server keys changed! Restart the handshake pool ...")
+            self.restart_pool()
+
+        # Run the negotiated key exchange, a broken or shut down pool raises a runtime error, it fails the handshake and is restarted once, unless the server quits
+        exchange_start = time.bench_time_ns()
+        self.handshake_info_time.record(exchange_start - start)
+        self.pending_handshakes += 1
+        pool = self.pool
+        try:
+            key = await self.handshakes[control_ver](connection, ip, port, server_info + client_info + acknowledgement)
+        except RuntimeError as e:
+            self.logger.warning("Client connection {}:{} failed! Handshake pool failed ({!r}) ...", ip, port, e)
+            if self.pool is pool and not self.exit:
+                self.logger.warning("Restart the handshake pool ...")
+                self.restart_pool()
+            key = None
+        finally:
+            self.pending_handshakes -= 1
+        if key is not None:
+            self.handshake_exchange_times[control_ver].record(time.bench_time_ns() - exchange_start)
+
+        # Compress the session, if the compression was accepted
+        if key is not None and acknowledgement == CONTROL_OPTION_ACCEPT.encode("utf-8"):
+            connection.compressor = Compressor(self.compression_level, self.compression_threshold, self.max_frame_size)
+
+        # Log info and return the session key
+        if key is not None:
+            self.logger.info("Successfully connected with client {}:{} (Version: {}, Control version: {}, Compression: {})!", ip, port, version, control_ver, connection.compressor is not None)
+        return key
+
+    # Handshake rsa
+    async def handshake_rsa(self, connection: Connection, ip: str, port: int, transcript: bytes) -> bytes | None:
+
+        # Send the server public rsa key
+        try:
+            connection.write(self.server.keys.public_key_bytes)
+            await connection.drain()
+        except so.error:
+            self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+            return None
+
+        # Receive the client public rsa key
+        try:
+            client_key = bytes(await connection.read_until(b"-----END ", 2048))
+            client_key += bytes(await connection.read_until(b"-----", 64))
+        except (so.error, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            self.logger.info("Client connection {}:{} failed! Invalid key ...", ip, port)
+            return None
+
+        # Generate a new aes password and encrypt it with the client key
+        password = aes.generate_password(30)
+        try:
+            encrypted_password = await self.run_job(worker.rsa_challenge, client_key, password)
+        except (ValueError, IndexError, TypeError):
+            self.logger.info("Client connection {}:{} failed! Invalid key ...", ip, port)
+            return None
+
+        # Send the aes password
+        try:
+            connection.write(str(len(encrypted_password)).zfill(8).encode("utf-8"), encrypted_password)
+            await connection.drain()
+        except (so.error, ValueError):
+            self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+            return None
+
+        # Receive and check the aes password
+        try:
+            length = int(bytes(await connection.read_exactly(8)).decode("utf-8"))
+            key = await self.run_job(worker.rsa_response, bytes(await connection.read_exactly(length)), password)
+            if key is None:
+                self.logger.info("Server connection {}:{} failed! Cannot validate password ...", ip, port)
+                return None
+        except (so.error, asyncio.IncompleteReadError, UnicodeDecodeError, ValueError):
+            self.logger.info("Server connection {}:{} failed! Invalid password ...", ip, port)
+            return None
+
+        # Return the session key
+        return key
+
+    # Handshake x25519
+    async def handshake_x25519(self, connection: Connection, ip: str, port: int, transcript: bytes) -> bytes | None:
+
+        # Generate a new ephemeral x25519 key
+        ephemeral_key, server_keys = await self.run_job(worker.x25519_ephemeral)
 
-            # Receive and check the aes password
+        # Send the server static and ephemeral x25519 public keys
+        try:
+            connection.write(server_keys)
+            await connection.drain()
+        except so.error:
+            self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+            return None
+
+        # Receive the client ephemeral x25519 public key and derive the keys
+        try:
+            client_key = bytes(await connection.read_exactly(32))
+            transcript += server_keys + client_key
+            key, confirmation_key = await self.run_job(worker.x25519_keys, ephemeral_key, client_key, transcript, f"{NAME} {CONTROL_VER_X25519}".encode("utf-8"))
+        except (so.error, asyncio.IncompleteReadError, ValueError):
+            self.logger.info("Client connection {}:{} failed! Invalid key ...", ip, port)
+            return None
+
+        # Confirm the keys and return the session key
+        if not await self.confirm(connection, ip, port, b"", confirmation_key, transcript):
+            return None
+        return key
+
+    # Handshake pipelined (the first flight of the client carries its information and key, the server answers in one flight)
+    async def handshake_pipelined(self, connection: Connection, ip: str, port: int, transcript: bytes) -> bytes | None:
+
+        # Receive the client ephemeral x25519 public key, generate a new ephemeral x25519 key and derive the keys
+        try:
+            client_key = bytes(await connection.read_exactly(32))
+            server_keys, key, confirmation_key = await self.run_job(worker.x25519_exchange, client_key, transcript, f"{NAME} {CONTROL_VER_PIPELINED}".encode("utf-8"))
+            transcript += client_key + server_keys
+        except (so.error, asyncio.IncompleteReadError, ValueError):
+            self.logger.info("Client connection {}:{} failed! Invalid key ...", ip, port)
+            return None
+
+        # Send the server keys together with the confirmation, confirm the keys and return the session key
+        if not await self.confirm(connection, ip, port, server_keys, confirmation_key, transcript):
+            return None
+        return key
+
+    # Handshake resume
+    async def handshake_resume(self, connection: Connection, ip: str, port: int, transcript: bytes) -> bytes | None:
+
+        # Receive the resumption ticket and the client nonce
+        try:
+            length = bytes(await connection.read_exactly(8))
+            if not 0 <= int(length.decode("utf-8")) <= CONTROL_TICKET_MAX_SIZE:
+                raise ValueError("Ticket too large")
+            resumption_ticket = bytes(await connection.read_exactly(int(length)))
+            client_nonce = bytes(await connection.read_exactly(32))
+            transcript += length + resumption_ticket + client_nonce
+        except (so.error, asyncio.IncompleteReadError, UnicodeDecodeError, ValueError):
+            self.logger.info("Client connection {}:{} failed! Invalid ticket ...", ip, port)
+            return None
+
+        # Fall back to the full x25519 exchange, if the ticket is invalid or expired
+        secret = self.tickets.open(resumption_ticket)
+        if secret is None:
+            self.logger.debug("Cannot resume session of {}:{}! Fall back to a full handshake ...", ip, port)
             try:
-                length = int(client.recv(8).decode("utf-8"))
-                if rsa.decrypt_bytes(self.server.private_key, client.recv(length)).decode("utf-8") != password:
-                    self.logger.info(f"Server connection {ip}:{port} failed! Cannot validate password ...")
-                    client.close()
-                    continue
+                connection.write(b"0")
             except so.error:
-                self.logger.info(f"Server connection {ip}:{port} failed! Invalid password ...")
-                client.close()
-                continue
+                self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+                return None
+            return await self.handshake_x25519(connection, ip, port, transcript + b"0")
 
-            # Start handling
-            self.logger.info(f"Successfully connected with client {ip}:{port} (Version: {version})!")
-            self.handle_client(aes.get_key(password), client, ip, port)
+        # Derive the keys from the resumption secret and both nonces
+        server_nonce = secrets.token_bytes(32)
+        transcript += b"1" + server_nonce
+        key, confirmation_key = x25519.derive_keys(secret, transcript, f"{NAME} {CONTROL_VER_RESUME}".encode("utf-8"))
 
-        # Log info
-        self.logger.debug("Stopped listening for a client.")
+        # Confirm the keys and return the session key
+        self.logger.debug("Resume session of {}:{} ...", ip, port)
+        if not await self.confirm(connection, ip, port, b"1" + server_nonce, confirmation_key, transcript):
+            return None
+        return key
+
+    # Run job (runs cpu heavy handshake steps on the handshake pool, so the event loop only moves bytes)
+    async def run_job(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    # Confirm (sends the prefix and the server confirmation and checks the client confirmation)
+    async def confirm(self, connection: Connection, ip: str, port: int, prefix: bytes, confirmation_key: bytes, transcript: bytes) -> bool:
+
+        # Send the server confirmation
+        try:
+            connection.write(prefix, x25519.confirmation_tag(confirmation_key, b"server", transcript))
+            await connection.drain()
+        except so.error:
+            self.logger.info("Server connection {}:{} failed! Connection closed ...", ip, port)
+            return False
+
+        # Receive and check the client confirmation
+        try:
+            if not hmac.compare_digest(bytes(await connection.read_exactly(32)), x25519.confirmation_tag(confirmation_key, b"client", transcript)):
+                self.logger.info("Server connection {}:{} failed! Cannot validate confirmation ...", ip, port)
+                return False
+        except (so.error, asyncio.IncompleteReadError):
+            self.logger.info("Server connection {}:{} failed! Invalid confirmation ...", ip, port)
+            return False
+
+        # Return true
+        return True
+
+    # Command stop
+    async def command_stop(self, session: Session) -> bytes | None:
+        self.server.exit = True
+        session.close_msg = "Server closed ..."
+        return None
+
+    # Command exit
+    async def command_exit(self, session: Session) -> bytes | None:
+        session.close_msg = "Disconnected ..."
+        return None
+
+    # Command restart
+    async def command_restart(self, session: Session) -> bytes:
+        return ("Restarting ..." if await self.restart() else "Restart failed ...").encode("utf-8")
+
+    # Command ticket
+    async def command_ticket(self, session: Session) -> bytes:
+        return self.tickets.issue(ticket.resumption_secret(session.key))
+
+    # Command stats
+    async def command_stats(self, session: Session) -> bytes:
+        return json.dumps(self.stats(), separators=(",", ":")).encode("utf-8")
+
+    # Command profile (profiles the event loop for some seconds or until stopped, or the commands of a session given by its address, the own session by default, which also records the work of other sessions, while its command waits in an await like the opening of a list or a commit)
+    async def command_profile(self, session: Session, action: str, argument: str | None) -> bytes:
+
+        # Start a profile of the event loop for a positive and finite duration
+        if action == "start":
+            try:
+                duration = float(argument) if argument is not None else None
+            except ValueError:
+                duration = math.nan
+            if duration is not None and not (math.isfinite(duration) and duration > 0):
+                return "Invalid arguments! Usage: profile start [seconds] ...".encode("utf-8")
+            return ("Profiling ..." if self.profiler.start(duration) else "Already profiling ...").encode("utf-8")
+
+        # Start a profile of a session
+        if action == "session":
+            target = self.clients.get(argument) if argument is not None else session
+            if target is None:
+                return "Unknown session! ...".encode("utf-8")
+            return ("Profiling ..." if self.profiler.start_session(target) else "Already profiling ...").encode("utf-8")
+
+        # Stop the profile and write it
+        if action == "stop":
+            path = self.profiler.stop()
+            return (f"Profile written to {path} ..." if path else "Not profiling ...").encode("utf-8")
+        return "Invalid arguments! Usage: profile start [seconds] | session [address] | stop ...".encode("utf-8")
+
+    # Command memory (traces the allocations, every snapshot writes the top allocations and the difference to the last snapshot)
+    async def command_memory(self, session: Session, action: str, frames: int | None) -> bytes:
+
+        # Start the tracing with a count of frames, which tracemalloc supports
+        if action == "start":
+            frames = 1 if frames is None else frames
+            if not 1 <= frames <= PROFILE_MEMORY_FRAMES_MAX:
+                return "Invalid arguments! Usage: memory start [frames] | snapshot | stop ...".encode("utf-8")
+            return ("Tracing memory ..." if self.profiler.start_memory(frames) else "Already tracing memory ...").encode("utf-8")
+
+        # Take a snapshot
+        if action == "snapshot":
+            paths = await self.loop.run_in_executor(None, self.profiler.snapshot_memory)
+            return (f"Memory snapshot written to {', '.join(paths)} ..." if paths else "Not tracing memory ...").encode("utf-8")
+
+        # Stop the tracing
+        if action == "stop":
+            return ("Stopped tracing memory ..." if self.profiler.stop_memory() else "Not tracing memory ...").encode("utf-8")
+        return "Invalid arguments! Usage: memory start [frames] | snapshot | stop ...".encode("utf-8")
+
+    # Command stacks (writes the stacks of all threads and tasks)
+    async def command_stacks(self, session: Session) -> bytes:
+        return f"Stacks written to {self.profiler.dump_stacks()} ...".encode("utf-8")
+
+    # Stats (returns the gauges, the counters and the histogram summaries, the durations are in nanoseconds)
+    def stats(self) -> dict:
+        stats = {
+            "uptime": time.bench_time() - self.started_at,
+            "gauges": {
+                "sessions": len(self.sessions),
+                "pending_handshakes": self.pending_handshakes,
+                "open_lists": len(self.server.manager.servers),
+                "subscribed_lists": len(self.broadcaster.subscribers),
+            },
+        }
+        stats.update(metrics.snapshot())
+        stats["counters"].update({
+            "lists.hits": self.server.manager.hits,
+            "lists.misses": self.server.manager.misses,
+            "lists.evictions": self.server.manager.evictions,
+            "push.frames": self.broadcaster.frames,
+            "push.sent": self.broadcaster.pushes,
+        })
+        return stats
+
+    # Record command (the timing hook of the registry)
+    def record_command(self, name: str, duration: int) -> None:
+        self.command_times[name].record(duration)
+
+    # Dump metrics (writes the stats to the metrics file in every interval)
+    async def dump_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            await self.loop.run_in_executor(None, metrics.dump, METRICS_PATH, self.stats())
 
     # Handle client
-    def handle_client(self, key: bytes, socket: so.socket, ip: str, port: int):
+    async def handle_client(self, key: bytes, connection: Connection, ip: str, port: int) -> None:
 
-        # Set the timeout
-        socket.settimeout(0.5)
+        # Define the session
+        session = Session(key, connection, Subscriber(key, connection, self.push_queue_size))
+        session.task = asyncio.current_task()
+        self.clients[f"{ip}:{port}"] = session
 
-        # Define the close message
-        close_msg = ""
+        try:
 
-        # Receiving loop
-        while not self.exit:
+            # Receiving loop
+            while True:
 
-            # Receive data
-            data = self.receive(key, socket)
+                # Receive data, the session is idle meanwhile
+                session.idle = True
+                data = await self.receive(key, connection)
+                session.idle = False
 
-            # Check for connection lost
-            if type(data) == bool:
-                if data:
-                    close_msg = "Reason unknown ..."
+                # Check for connection lost
+                if data is None:
+                    session.close_msg = "Reason unknown ..."
                     break
-                continue
 
-            # Log info
-            self.logger.info(f"Command issued: {data.decode('utf-8')}")
+                # Decode the frame once
+                text = data.decode("utf-8", "replace")
 
-            # Handle command
-            match data.decode("utf-8").strip().split(" ")[0].lower():
-                case "stop":
-                    self.server.exit = True
-                    close_msg = "Server closed ..."
+                # Answer the frame without running it, while the lists are handed to the new process, so the client retries it there
+                if self.draining:
+                    session.close_msg = "Server restarting ..."
+                    reply = f"{session.close_msg} Retry!".encode("utf-8")
+                    self.queue(session, [reply] * sum(1 for command in text[len(CONTROL_BATCH_PREFIX):].split("\n") if command) if text.startswith(CONTROL_BATCH_PREFIX) else reply)
+                    await self.flush(session)
                     break
-                case "exit":
-                    close_msg = "Disconnected ..."
+
+                # Enable the profile of the session around its commands, while it is profiled, it is disabled, even if a command raises
+                profile = session.profile
+                if profile is not None:
+                    profile.enable()
+                try:
+
+                    # Run the commands of a batch frame, one per line after the first line, and queue all replies as one frame
+                    if text.startswith(CONTROL_BATCH_PREFIX):
+                        replies = await self.registry.execute_batch(session, text[len(CONTROL_BATCH_PREFIX):].split("\n"))
+                        self.queue(session, replies)
+
+                    # Run the command and queue its reply
+                    else:
+                        reply = await self.registry.execute(session, text)
+                        if reply is not None:
+                            self.queue(session, reply)
+
+                finally:
+                    if profile is not None:
+                        profile.disable()
+
+                # Close the session after its command, if the client or the server quits or restarts
+                if not session.close_msg and self.exit:
+                    session.close_msg = "Server restarting ..." if self.draining else "Server closed ..."
+                if session.close_msg:
+                    await self.flush(session)
                     break
-                case other:
-                    self.send_msg(key, socket, "Invalid command! Type 'help' for more information ...")
 
-        # Close the socket
-        self.logger.info(f"Lost connection with {ip}:{port}! {close_msg}")
-        socket.close()
+                # Send the queued replies, unless the client already pipelined the next frame
+                if not connection.frame_ready() or session.queued_size >= CONTROL_BUFFER_SIZE:
+                    await self.flush(session)
+
+        except asyncio.CancelledError:
+
+            # Set the close message
+            session.close_msg = "Server restarting ..." if self.draining else "Server closed ..."
+
+        finally:
+
+            # Stop the pushes to the session
+            self.broadcaster.remove(session.subscriber)
+
+            # Forget the session and write its profile, if it is profiled
+            self.clients.pop(f"{ip}:{port}", None)
+            if self.profiler.session is session:
+                self.profiler.stop()
+
+        # Log info
+        self.logger.info("Lost connection with {}:{}! {}", ip, port, session.close_msg)
+
+    # Flush (waits until the changes of the queued replies are durable and sends the replies at once, the replies of failed commits tell the client, that the change is not durable)
+    async def flush(self, session: Session) -> bool:
+        try:
+
+            # Wait for the commits and collect the replies of the failed ones
+            failed = set()
+            if session.commits:
+                commits, session.commits = session.commits, []
+                results = await asyncio.gather(*(asyncio.wrap_future(future) for future, _ in commits), return_exceptions=True)
+                for (_, reply), result in zip(commits, results):
+                    if isinstance(result, Exception):
+                        self.logger.error("Commit failed! {!r}", result)
+                        failed.add(id(reply))
+
+            # Compress, encrypt and send the replies at once, no other writer of the connection may run in between, so the frames keep the order of the compression stream
+            replies, session.replies, session.queued_size = session.replies, [], 0
+            if replies:
+                session.connection.write_frames([self.encrypt(session.key, session.connection, self.frame(reply, failed)) for reply in replies])
+                await session.connection.drain()
+            return True
+
+        except so.error:
+            return False
 
 
     # STATIC METHODS
 
+    # Encrypt (compresses the data, if the session is compressed, and encrypts it)
+    @staticmethod
+    def encrypt(key: bytes, connection: Connection, data: bytes) -> bytes:
+        return aes.encrypt_bytes(key, connection.compressor.compress(data) if connection.compressor is not None else data)
+
+    # Queue (queues the reply or the replies of a batch for the next flush, they are compressed and encrypted, when they are written)
+    @staticmethod
+    def queue(session: Session, data: bytes | list[bytes]) -> None:
+        session.replies.append(data)
+        session.queued_size += len(data) if type(data) != list else sum(len(reply) for reply in data) + CONTROL_FRAME_HEADER_SIZE * len(data)
+
+    # Frame (returns the data of a reply frame, a batch is joined with the length of every reply, the replies of failed commits are replaced)
+    @staticmethod
+    def frame(data: bytes | list[bytes], failed: set[int]) -> bytes:
+        if type(data) != list:
+            return "Change not durable! ...".encode("utf-8") if id(data) in failed else data
+        replies = ["Change not durable! ...".encode("utf-8") if id(reply) in failed else reply for reply in data]
+        return b"".join(b"%016d" % len(reply) + reply for reply in replies)
+
     # Send
     @staticmethod
-    def send(key: bytes, socket: so.socket, data: bytes) -> bool:
+    async def send(key: bytes, connection: Connection, data: bytes) -> bool:
 
         try:
 
             # Encrypt the data
-            encrypted_data = aes.encrypt_bytes(key, data)
+            encrypted_data = Control.encrypt(key, connection, data)
 
-            # Send the header with the data size
-            socket.send(str(len(encrypted_data)).zfill(16).encode("utf-8"))
-
-            # Send the encrypted data
-            socket.send(encrypted_data)
+            # Send the header with the data size and the encrypted data at once
+            connection.write_frame(encrypted_data)
+            await connection.drain()
 
             # Return true
             return True
@@ -293,32 +925,25 @@ class Control(Thread):
 
     # Send message
     @staticmethod
-    def send_msg(key: bytes, socket: so.socket, msg: str) -> bool:
+    async def send_msg(key: bytes, connection: Connection, msg: str) -> bool:
 
         # Send the encoded message
-        return Control.send(key, socket, msg.encode("utf-8"))
+        return await Control.send(key, connection, msg.encode("utf-8"))
 
     # Receive
     @staticmethod
-    def receive(key: bytes, socket: so.socket) -> bytes | bool:
+    async def receive(key: bytes, connection: Connection) -> bytes | None:
 
         try:
 
-            # Receive the data size
-            length = int(socket.recv(16).decode("utf-8"))
-
             # Receive the encrypted data
-            encrypted_data = socket.recv(length)
+            encrypted_data = await connection.read_frame()
 
-            # Decrypt and return the data
-            return aes.decrypt_bytes(key, encrypted_data)
+            # Decrypt the data and decompress it, if the session is compressed
+            data = aes.decrypt_bytes(key, encrypted_data)
+            return connection.compressor.decompress(data) if connection.compressor is not None else data
 
-        except so.timeout:
+        except (so.error, asyncio.IncompleteReadError, UnicodeDecodeError, ValueError):
 
-            # Return false
-            return False
-
-        except (so.error, ValueError):
-
-            # Return true
-            return True
+            # Return none
+            return None
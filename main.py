@@ -8,8 +8,11 @@ from constants import *
 from utils import file
 from utils import time
 from utils import logging
+from utils import handover
 from utils.config import Config
-from utils.crypt import rsa
+from utils.crypt import rsa, x25519
+from utils.crypt.keys import KeyCache
+from server.manager import Manager
 
 
 # CLASSES
@@ -18,51 +21,81 @@ from utils.crypt import rsa
 class Server:
 
     # CONSTRUCTOR
-    def __init__(self, debug: bool, log_file: IO) -> None:
+    def __init__(self, debug: bool, log_file: IO, logging_config: Config, handover: dict | None = None) -> None:
 
-        # Set debug and log file
+        # Set debug, log file, logging configuration and the state of the old process, if restarted gracefully
         self.debug = debug
         self.log_file = log_file
+        self.logging_config = logging_config
+        self.handover = handover
 
         # Define the threading lock
         self.lock = th.Lock()
 
+        # Load the log file format
+        self.json_lines = self.logging_config.data.setdefault("json_lines", False)
+
+        # Start the background log writer, if enabled
+        self.log_writer = None
+        if self.logging_config.data.setdefault("async", True):
+            self.log_writer = logging.Writer(self.log_file, self.logging_config.data.setdefault("queue_size", LOG_QUEUE_SIZE), self.logging_config.data.setdefault("queue_policy", "block") == "block", self.json_lines)
+            self.log_writer.start()
+
         # Define the logger
-        self.logger = logging.Logger(self.lock, f"{NAME} - SERVER", LOG_DEBUG if self.debug else LOG_INFO, self.log_file)
+        self.logger = logging.Logger(self.lock, f"{NAME} - SERVER", LOG_DEBUG if self.debug else LOG_INFO, self.log_file, self.log_writer, self.json_lines)
 
         # Load configurations
         self.logger.debug("Load configurations ...")
         self.control_config = Config(f"{CONFIG_PATH}/control.json")
 
-        # Load the server private and public rsa key
-        self.logger.debug("Load server private rsa key ...")
-        if file.exist(f"{KEY_PATH}/private_key.pem"):
-            self.private_key = rsa.import_key_from_file(f"{KEY_PATH}/private_key.pem")
-        else:
+        # Generate missing server keys
+        if not file.exist(f"{KEY_PATH}/private_key.pem"):
             self.logger.warning("No server private rsa key found! Generating new one ...")
-            self.private_key = rsa.generate_private_key()
-            rsa.export_key_to_file(f"{KEY_PATH}/private_key.pem", self.private_key)
-        self.logger.debug("Load server public rsa key ...")
-        if file.exist(f"{KEY_PATH}/public_key.pem"):
-            self.public_key = rsa.import_key_from_file(f"{KEY_PATH}/public_key.pem")
-        else:
+            rsa.export_key_to_file(f"{KEY_PATH}/private_key.pem", rsa.generate_private_key())
+        if not file.exist(f"{KEY_PATH}/public_key.pem"):
             self.logger.warning("No server public rsa key found! Generating new one ...")
-            self.public_key = rsa.generate_public_key(self.private_key)
-            rsa.export_key_to_file(f"{KEY_PATH}/public_key.pem", self.public_key)
+            rsa.export_key_to_file(f"{KEY_PATH}/public_key.pem", rsa.generate_public_key(rsa.import_key_from_file(f"{KEY_PATH}/private_key.pem")))
+        if not file.exist(f"{KEY_PATH}/x25519_private_key.pem"):
+            self.logger.warning("No server x25519 key found! Generating new one ...")
+            x25519.export_key_to_file(f"{KEY_PATH}/x25519_private_key.pem", x25519.generate_private_key())
+
+        # Load the server keys and their cached key material
+        self.logger.debug("Load server keys ...")
+        self.keys = KeyCache(f"{KEY_PATH}/private_key.pem", f"{KEY_PATH}/public_key.pem", f"{KEY_PATH}/x25519_private_key.pem")
+
+        # Load the list manager, the lists are only opened on first access
+        self.logger.debug("Load the list manager ...")
+        self.lists_config = Config(f"{CONFIG_PATH}/lists.json")
+        self.manager = Manager(SERVER_PATH, self.lists_config.data.setdefault("memory_budget", MANAGER_MEMORY_BUDGET), self.lists_config.data.setdefault("max_open", MANAGER_MAX_OPEN), self.lists_config.data.setdefault("idle_time", MANAGER_IDLE_TIME), self.lists_config.data.setdefault("commit_delay", WAL_COMMIT_DELAY), self.lists_config.data.setdefault("snapshot_records", WAL_SNAPSHOT_RECORDS), self.lists_config.data.setdefault("journal_size", LIST_JOURNAL_SIZE))
 
         # Load the control server
         self.logger.debug("Load the control server ...")
         from control import Control
         self.control = Control(self)
 
-        # Define exit and restart variable
-        self.exit = False
+        # Define exit event and restart variable
+        self.exit_event = th.Event()
         self.restart = ""
 
         # Log info
         self.logger.info("Initialized.")
 
 
+    # PROPERTIES
+
+    # Exit (setting it wakes up the waiting main thread)
+    @property
+    def exit(self) -> bool:
+        return self.exit_event.is_set()
+
+    @exit.setter
+    def exit(self, value: bool) -> None:
+        if value:
+            self.exit_event.set()
+        else:
+            self.exit_event.clear()
+
+
     # METHODS
 
     # Run
@@ -73,8 +106,7 @@ class Server:
         self.control.start()
 
         # Wait for control thread started
-        while not self.control.started:
-            time.sleep(0.01)
+        self.control.started.wait()
 
         # Check for cancel
         if self.exit:
@@ -85,8 +117,7 @@ class Server:
         self.logger.info(f"Done! ({time.run_time():.2f}s)")
 
         # Wait for quit
-        while not self.exit:
-            time.sleep(0.01)
+        self.exit_event.wait()
 
         # Quit the server
         self.quit(self.restart)
@@ -101,12 +132,23 @@ class Server:
         self.control.exit = True
         self.control.join()
 
-        # Save configurations
-        self.logger.debug("Save configurations ...")
-        self.control_config.save()
+        # Flush and close all open lists
+        self.logger.debug("Close lists ...")
+        self.manager.close()
+
+        # Save configurations, after a graceful restart the new process owns them
+        if not self.control.draining:
+            self.logger.debug("Save configurations ...")
+            self.control_config.save()
+            self.logging_config.save()
+            self.lists_config.save()
+
+        # Write all waiting log records
+        if self.log_writer:
+            self.log_writer.close()
 
         # Exit
-        exit(self.debug, self.log_file, restart)
+        exit(self.debug, self.log_file, restart, self.control.draining)
 
 
 # FUNCTIONS
@@ -134,36 +176,27 @@ def main(args: list[str]) -> None:
             if debug: logging.log_main(f"Create data directory '{directory}' ...", LOG_DEBUG)
             file.make_dir(directory)
 
-    # Clear log directory
-    if debug: logging.log_main(f"Clear log directory '{LOG_PATH}' ...", LOG_DEBUG)
-    files = []
-    for element in file.list_dir(LOG_PATH):
-        if file.is_file(f"{LOG_PATH}/{element}"):
-            if file.file_type(element) == ".txt" and element.startswith("server_log_"):
-                files.append(f"{LOG_PATH}/{element}")
-    if len(files) >= 5:
-        for index, element in enumerate(files):
-            file.delete(element)
-            if index >= len(files) - 5:
-                break
-
-    # Setup log file
-    log_file_path = f"{LOG_PATH}/server_log_{time.datetime_f2()}.txt"
-    if debug: logging.log_main(f"Setup log file at '{log_file_path}' ...", LOG_DEBUG)
-    log_file = file.open_text(log_file_path, "w")
-    log_file.write(f"{NAME}\n")
-    log_file.write(f"{'-' * len(NAME)}\n")
-    log_file.write("\n")
-    log_file.write(f"Author: {AUTHOR}\n")
-    log_file.write(f"Version: {VERSION}\n")
-    log_file.write("\n")
+    # Load the state of the old process, if restarted gracefully
+    state = handover.load()
+    if state is not None:
+        logging.log_main("Take over the listening socket from the old process ...", LOG_INFO)
+
+    # Load the logging configuration
+    logging_config = Config(f"{CONFIG_PATH}/logging.json")
+
+    # Setup rotating log file (json log files get no header)
+    if debug: logging.log_main(f"Setup rotating log file in '{LOG_PATH}' ...", LOG_DEBUG)
+    header = ""
+    if not logging_config.data.setdefault("json_lines", False):
+        header = f"{NAME}\n{'-' * len(NAME)}\n\nAuthor: {AUTHOR}\nVersion: {VERSION}\n\n"
+    log_file = logging.RotatingFile(LOG_PATH, header, logging_config.data.setdefault("rotate_size", LOG_ROTATE_SIZE), logging_config.data.setdefault("rotate_interval", LOG_ROTATE_INTERVAL), logging_config.data.setdefault("retain_files", LOG_RETAIN_FILES), logging_config.data.setdefault("retain_size", LOG_RETAIN_SIZE), logging_config.data.setdefault("compress", True), (state["log_file"],) if state else ())
 
     # Define secure environment
     try:
 
         # Initialize server
         logging.log_main("Initialize server ...", LOG_INFO)
-        server = Server(debug, log_file)
+        server = Server(debug, log_file, logging_config, state)
 
         # Run server
         logging.log_main("Run server ...", LOG_INFO)
@@ -206,11 +239,11 @@ def main(args: list[str]) -> None:
             pass
 
 # Exit
-def exit(debug: bool, log_file: IO, restart: str = "") -> None:
+def exit(debug: bool, log_file: IO, restart: str = "", handed_over: bool = False) -> None:
 
-    # Close log file
+    # Close log file, it is compressed here, if the new process already writes its own
     if debug: logging.log_main("Close log file ...", LOG_DEBUG)
-    log_file.close()
+    log_file.close(handed_over)
 
     # Run restart, if available
     if restart != "":
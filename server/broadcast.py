@@ -0,0 +1,178 @@
+# IMPORTS
+from collections import deque
+import asyncio
+import json
+import socket as so
+from constants import *
+from server.server import Server
+from utils.connection import Connection
+from utils.crypt import aes
+
+
+# VARIABLES
+
+# Resync notice (tells a subscriber, that pushes were dropped and its lists must be synced again)
+RESYNC = json.dumps({"resync": True}, separators=(",", ":")).encode("utf-8")
+
+
+# CLASSES
+
+# Subscriber (one session with its subscribed lists and a bounded queue of frames, written by its own task)
+class Subscriber:
+
+    # CONSTRUCTOR
+    def __init__(self, key: bytes, connection: Connection, queue_size: int = BROADCAST_QUEUE_SIZE) -> None:
+
+        # Set the session key, the connection and the queue size
+        self.key = key
+        self.connection = connection
+        self.queue_size = queue_size
+
+        # Define the subscribed lists, the queue, its wake up event, the writer task and the count of overflows
+        self.lists: set[str] = set()
+        self.queue: deque[bytes] = deque()
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.overflows = 0
+
+
+    # METHODS
+
+    # Push (queues the data, drops the queue for a resync notice, if the subscriber falls behind)
+    def push(self, data: bytes) -> None:
+
+        # Replace the queue with a resync notice, if it is full, the following changes are still pushed
+        if len(self.queue) >= self.queue_size:
+            self.queue.clear()
+            self.queue.append(RESYNC)
+            self.overflows += 1
+
+        # Queue the data
+        self.queue.append(data)
+        self.ready.set()
+
+        # Start the writer
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.write())
+
+    # Write (compresses, encrypts and sends the queued frames in write order, only this task waits for the connection)
+    async def write(self) -> None:
+        try:
+            while True:
+                while not self.queue:
+                    self.ready.clear()
+                    await self.ready.wait()
+                data = self.queue.popleft()
+                self.connection.write_frame(aes.encrypt_bytes(self.key, self.connection.compressor.compress(data) if self.connection.compressor is not None else data))
+                await self.connection.drain()
+        except so.error:
+            self.queue.clear()
+
+    # Close
+    def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        self.queue.clear()
+
+
+# Broadcaster (pushes the changes of lists to their subscribers, coalesces bursts of changes into one frame per list and window)
+class Broadcaster:
+
+    # CONSTRUCTOR
+    def __init__(self, window: float = BROADCAST_WINDOW) -> None:
+
+        # Set the window
+        self.window = window
+
+        # Define the subscribers and the last pushed revision of each list
+        self.subscribers: dict[str, set[Subscriber]] = {}
+        self.revisions: dict[str, int] = {}
+
+        # Define the changed lists, which wait for the end of the window, and the flush timer
+        self.changed_servers: dict[str, Server] = {}
+        self.timer: asyncio.TimerHandle | None = None
+
+        # Define the counters
+        self.frames = 0
+        self.pushes = 0
+
+
+    # METHODS
+
+    # Subscribe (the subscriber receives all changes after the current revision of the list)
+    def subscribe(self, server: Server, subscriber: Subscriber) -> None:
+
+        # Push the pending changes to the other subscribers first, so the new one starts at the current revision
+        if server.name in self.changed_servers:
+            self.flush()
+
+        # Add the subscriber
+        if server.name not in self.subscribers:
+            self.subscribers[server.name] = set()
+            self.revisions[server.name] = server.revision
+        self.subscribers[server.name].add(subscriber)
+        subscriber.lists.add(server.name)
+
+    # Unsubscribe
+    def unsubscribe(self, name: str, subscriber: Subscriber) -> None:
+
+        # Remove the subscriber and forget the list, if it was the last one
+        subscriber.lists.discard(name)
+        subscribers = self.subscribers.get(name)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[name]
+            del self.revisions[name]
+            self.changed_servers.pop(name, None)
+
+    # Remove (unsubscribes the subscriber from all lists and stops its writer)
+    def remove(self, subscriber: Subscriber) -> None:
+        for name in tuple(subscriber.lists):
+            self.unsubscribe(name, subscriber)
+        subscriber.close()
+
+    # Changed (called by the list servers after every change, runs in the event loop)
+    def changed(self, server: Server) -> None:
+
+        # Ignore lists without subscribers
+        if server.name not in self.subscribers:
+            return
+
+        # Wait for more changes until the end of the window
+        self.changed_servers[server.name] = server
+        if self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    # Flush (serializes the changes of every changed list once and pushes them to its subscribers)
+    def flush(self) -> None:
+
+        # Stop the timer
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        # Push the changes after the last pushed revision, a resync notice, if the journal does not reach back to it
+        for name, server in self.changed_servers.items():
+            revision = server.revision
+            changes = server.changes(self.revisions[name])
+            if changes is None:
+                data = json.dumps({"push": name, "revision": revision, "resync": True}, separators=(",", ":")).encode("utf-8")
+            else:
+                data = json.dumps({"push": name, "from": self.revisions[name], "revision": revision, "changes": changes}, separators=(",", ":")).encode("utf-8")
+            self.revisions[name] = revision
+            for subscriber in self.subscribers[name]:
+                subscriber.push(data)
+            self.frames += 1
+            self.pushes += len(self.subscribers[name])
+        self.changed_servers.clear()
+
+    # Close
+    def close(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.changed_servers.clear()
+        for subscriber in {subscriber for subscribers in self.subscribers.values() for subscriber in subscribers}:
+            self.remove(subscriber)
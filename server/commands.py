@@ -0,0 +1,104 @@
+# IMPORTS
+import json
+from server.broadcast import Broadcaster
+from server.manager import Manager
+from server.server import Server
+from utils.commands import Registry, Session
+
+
+# CLASSES
+
+# List commands (the control commands of the lists, the replies of changes are sent, after the changes are durable)
+class ListCommands:
+
+    # CONSTRUCTOR
+    def __init__(self, manager: Manager, broadcaster: Broadcaster) -> None:
+
+        # Set the manager and the broadcaster
+        self.manager = manager
+        self.broadcaster = broadcaster
+
+
+    # METHODS
+
+    # Register
+    def register(self, registry: Registry) -> None:
+        registry.register("sync", self.sync, "list revision:int")
+        registry.register("subscribe", self.subscribe, "list revision:int")
+        registry.register("unsubscribe", self.unsubscribe, "list")
+        registry.register("create", self.create, "list", True)
+        registry.register("add", self.add, "list category amount:int name:text", True)
+        registry.register("check", self.check, "list id:int", True)
+        registry.register("uncheck", self.uncheck, "list id:int", True)
+        registry.register("rename", self.rename, "list id:int name:text", True)
+        registry.register("remove", self.remove, "list id:int", True)
+        registry.register("move", self.move, "list id:int [before:int]", True)
+
+    # Sync (returns the changes of a list after the revision of the client or the full list)
+    async def sync(self, session: Session, name: str, revision: int) -> bytes:
+        server = await self.manager.open(name)
+        if server is None:
+            return "Unknown list! ...".encode("utf-8")
+        return server.sync(revision)
+
+    # Subscribe (returns the changes after the revision of the client like sync, the following changes are pushed to the subscriber)
+    async def subscribe(self, session: Session, name: str, revision: int) -> bytes:
+        server = await self.manager.open(name)
+        if server is None:
+            return "Unknown list! ...".encode("utf-8")
+        self.broadcaster.subscribe(server, session.subscriber)
+        return server.sync(revision)
+
+    # Unsubscribe
+    async def unsubscribe(self, session: Session, name: str) -> bytes:
+        self.broadcaster.unsubscribe(name, session.subscriber)
+        return "Unsubscribed ...".encode("utf-8")
+
+    # Create
+    async def create(self, session: Session, name: str) -> bytes:
+        server = await self.manager.open(name) if self.manager.create(name) else None
+        if server is None:
+            return "Invalid or existing list! ...".encode("utf-8")
+        return json.dumps({"revision": server.revision}).encode("utf-8")
+
+    # Add
+    async def add(self, session: Session, name: str, category: str, amount: int, item: str) -> bytes:
+        server = await self.manager.open(name)
+        if server is None:
+            return "Unknown list! ...".encode("utf-8")
+        return self.change(session, server, ["add", server.shopping_list.next_id, item, category, amount, False, None])
+
+    # Check
+    async def check(self, session: Session, name: str, id: int) -> bytes:
+        return self.change(session, await self.manager.open(name), ["check", id, True])
+
+    # Uncheck
+    async def uncheck(self, session: Session, name: str, id: int) -> bytes:
+        return self.change(session, await self.manager.open(name), ["check", id, False])
+
+    # Rename
+    async def rename(self, session: Session, name: str, id: int, item: str) -> bytes:
+        return self.change(session, await self.manager.open(name), ["rename", id, item])
+
+    # Remove
+    async def remove(self, session: Session, name: str, id: int) -> bytes:
+        return self.change(session, await self.manager.open(name), ["remove", id])
+
+    # Move
+    async def move(self, session: Session, name: str, id: int, before: int | None) -> bytes:
+        return self.change(session, await self.manager.open(name), ["move", id, before])
+
+    # Change (applies the record and returns the new revision, the replies of the session wait for its commit, the reply is replaced, if the commit fails)
+    def change(self, session: Session, server: Server | None, record: list) -> bytes:
+
+        # Check the list
+        if server is None:
+            return "Unknown list! ...".encode("utf-8")
+
+        # Apply the record
+        future = server.execute(record)
+        if future is None:
+            return "Invalid change! ...".encode("utf-8")
+        reply = json.dumps({"revision": server.revision}).encode("utf-8")
+        session.commits.append((future, reply))
+        return reply
@@ -0,0 +1,270 @@
+# IMPORTS
+from typing import Iterator
+import sys
+from constants import *
+from server import snapshot
+
+
+# CLASSES
+
+# Item (a compact record, which is also a node of the ordered list)
+class Item:
+
+    # Slots
+    __slots__ = ("id", "name", "category", "amount", "checked", "prev", "next")
+
+    # CONSTRUCTOR
+    def __init__(self, id: int, name: str, category: str, amount: int, checked: bool) -> None:
+
+        # Set the id and the data
+        self.id = id
+        self.name = name
+        self.category = category
+        self.amount = amount
+        self.checked = checked
+
+        # Define the previous and the next item
+        self.prev: Item | None = None
+        self.next: Item | None = None
+
+
+    # METHODS
+
+    # To dict
+    def to_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "category": self.category, "amount": self.amount, "checked": self.checked}
+
+
+# Shopping list (all operations are o(1), except iterating over the items)
+class ShoppingList:
+
+    # CONSTRUCTOR
+    def __init__(self) -> None:
+
+        # Define the items by id, the first and the last item and the next id
+        self.items: dict[int, Item] = {}
+        self.first: Item | None = None
+        self.last: Item | None = None
+        self.next_id = 1
+
+        # Define the revision, which counts the applied mutation records
+        self.revision = 0
+
+        # Define the indexes by category and by checked state
+        self.categories: dict[str, dict[int, Item]] = {}
+        self.checked: dict[bool, dict[int, Item]] = {False: {}, True: {}}
+
+
+    # METHODS
+
+    # Length
+    def __len__(self) -> int:
+        return len(self.items)
+
+    # Iterate (in list order)
+    def __iter__(self) -> Iterator[Item]:
+        item = self.first
+        while item is not None:
+            yield item
+            item = item.next
+
+    # Contains
+    def __contains__(self, id: int) -> bool:
+        return id in self.items
+
+    # Get
+    def get(self, id: int) -> Item | None:
+        return self.items.get(id)
+
+    # In category (in insertion order of the category)
+    def in_category(self, category: str) -> list[Item]:
+        return list(self.categories.get(category, {}).values())
+
+    # With checked state (in insertion order of the state)
+    def with_checked(self, checked: bool) -> list[Item]:
+        return list(self.checked[checked].values())
+
+    # Add (inserts the item before the given item or at the end, the id is only given when loading or replaying)
+    def add(self, name: str, category: str = "", amount: int = 1, checked: bool = False, before: int | None = None, id: int | None = None) -> Item | None:
+
+        # Check the amount, which must fit into the rows of the snapshot, the item before and the id
+        if not LIST_AMOUNT_MIN <= amount <= LIST_AMOUNT_MAX:
+            return None
+        if before is not None and before not in self.items:
+            return None
+        if id is None:
+            id = self.next_id
+        elif id in self.items:
+            return None
+        self.next_id = max(self.next_id, id + 1)
+
+        # Create, index and link the item
+        item = Item(id, name, sys.intern(category), amount, checked)
+        self.items[id] = item
+        self.categories.setdefault(item.category, {})[id] = item
+        self.checked[checked][id] = item
+        self.link(item, self.items[before] if before is not None else None)
+
+        # Return the item
+        return item
+
+    # Remove
+    def remove(self, id: int) -> Item | None:
+
+        # Find the item
+        item = self.items.pop(id, None)
+        if item is None:
+            return None
+
+        # Unindex and unlink the item
+        self.unindex_category(item)
+        del self.checked[item.checked][id]
+        self.unlink(item)
+
+        # Return the item
+        return item
+
+    # Check
+    def check(self, id: int, checked: bool = True) -> bool:
+
+        # Find the item
+        item = self.items.get(id)
+        if item is None:
+            return False
+
+        # Move the item to the other checked index
+        if item.checked != checked:
+            del self.checked[item.checked][id]
+            self.checked[checked][id] = item
+            item.checked = checked
+        return True
+
+    # Rename
+    def rename(self, id: int, name: str) -> bool:
+
+        # Find the item and set the name
+        item = self.items.get(id)
+        if item is None:
+            return False
+        item.name = name
+        return True
+
+    # Set amount
+    def set_amount(self, id: int, amount: int) -> bool:
+
+        # Find the item, check the amount like add and set it
+        item = self.items.get(id)
+        if item is None or not LIST_AMOUNT_MIN <= amount <= LIST_AMOUNT_MAX:
+            return False
+        item.amount = amount
+        return True
+
+    # Categorize
+    def categorize(self, id: int, category: str) -> bool:
+
+        # Find the item
+        item = self.items.get(id)
+        if item is None:
+            return False
+
+        # Move the item to the other category index
+        if item.category != category:
+            self.unindex_category(item)
+            item.category = sys.intern(category)
+            self.categories.setdefault(item.category, {})[id] = item
+        return True
+
+    # Move (moves the item before the given item or to the end)
+    def move(self, id: int, before: int | None = None) -> bool:
+
+        # Find the items
+        item = self.items.get(id)
+        if item is None or (before is not None and before not in self.items) or before == id:
+            return False
+
+        # Relink the item
+        self.unlink(item)
+        self.link(item, self.items[before] if before is not None else None)
+        return True
+
+    # Apply (applies a mutation record, as written to the write-ahead log, and counts the revision)
+    def apply(self, record: list | tuple) -> bool:
+        match record[0]:
+            case "add":
+                applied = self.add(record[2], record[3], record[4], record[5], record[6], record[1]) is not None
+            case "remove":
+                applied = self.remove(record[1]) is not None
+            case "check":
+                applied = self.check(record[1], record[2])
+            case "rename":
+                applied = self.rename(record[1], record[2])
+            case "amount":
+                applied = self.set_amount(record[1], record[2])
+            case "categorize":
+                applied = self.categorize(record[1], record[2])
+            case "move":
+                applied = self.move(record[1], record[2])
+            case other:
+                applied = False
+        if applied:
+            self.revision += 1
+        return applied
+
+    # Dump (returns the binary snapshot of the list)
+    def dump(self) -> bytes:
+        return snapshot.encode(self.rows(), self.next_id, self.revision)
+
+    # Rows (returns the id, name, category, amount and checked state of the items in list order, a copy, which can be encoded on another thread)
+    def rows(self) -> list[tuple[int, str, str, int, bool]]:
+        return [(item.id, item.name, item.category, item.amount, item.checked) for item in self]
+
+    # Load (replaces the items with the items of the snapshot)
+    def load(self, data: snapshot.ListSnapshot) -> None:
+        self.clear()
+        for id, name, category, amount, checked in data:
+            self.add(name, category, amount, checked, None, id)
+        self.next_id = data.next_id
+        self.revision = data.revision
+
+    # Clear
+    def clear(self) -> None:
+        self.items.clear()
+        self.first = self.last = None
+        self.categories.clear()
+        self.checked = {False: {}, True: {}}
+
+    # Link (inserts the item before the given item or at the end)
+    def link(self, item: Item, before: Item | None) -> None:
+        if before is None:
+            item.prev, item.next = self.last, None
+            if self.last is not None:
+                self.last.next = item
+            else:
+                self.first = item
+            self.last = item
+        else:
+            item.prev, item.next = before.prev, before
+            if before.prev is not None:
+                before.prev.next = item
+            else:
+                self.first = item
+            before.prev = item
+
+    # Unlink
+    def unlink(self, item: Item) -> None:
+        if item.prev is not None:
+            item.prev.next = item.next
+        else:
+            self.first = item.next
+        if item.next is not None:
+            item.next.prev = item.prev
+        else:
+            self.last = item.prev
+        item.prev = item.next = None
+
+    # Unindex category (drops the category, if it gets empty)
+    def unindex_category(self, item: Item) -> None:
+        category = self.categories[item.category]
+        del category[item.id]
+        if not category:
+            del self.categories[item.category]
@@ -0,0 +1,196 @@
+# IMPORTS
+from collections import OrderedDict
+from typing import Callable
+import asyncio
+import re
+import threading as th
+from constants import *
+from server.server import Server
+from utils import file
+from utils import time
+
+
+# CLASSES
+
+# Manager (opens the list servers on first access and keeps the recently used ones within a memory budget)
+class Manager:
+
+    # CONSTRUCTOR
+    def __init__(self, path: str = SERVER_PATH, memory_budget: int = MANAGER_MEMORY_BUDGET, max_open: int = MANAGER_MAX_OPEN, idle_time: float = MANAGER_IDLE_TIME, commit_delay: float = WAL_COMMIT_DELAY, snapshot_records: int = WAL_SNAPSHOT_RECORDS, journal_size: int = LIST_JOURNAL_SIZE) -> None:
+
+        # Set the directory, the limits of the open lists and the options of the list servers
+        self.path = path
+        self.memory_budget = memory_budget
+        self.max_open = max_open
+        self.idle_time = idle_time
+        self.commit_delay = commit_delay
+        self.snapshot_records = snapshot_records
+        self.journal_size = journal_size
+
+        # Define the names of all lists, which are read from the directory on first use
+        self.names: set[str] | None = None
+        self.pattern = re.compile(LIST_NAME_PATTERN)
+
+        # Define the open servers from least to most recently used, their estimated memory and last use, the closing and the opening servers
+        self.servers: OrderedDict[str, Server] = OrderedDict()
+        self.memory: dict[str, int] = {}
+        self.used: dict[str, float] = {}
+        self.total_memory = 0
+        self.closing: dict[str, th.Thread] = {}
+        self.opening: dict[str, asyncio.Task] = {}
+        self.closed = False
+
+        # Define the listener, which is set on every opened server
+        self.listener: Callable[[Server], None] | None = None
+
+        # Define the counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    # METHODS
+
+    # Discover (returns the names of all lists without opening them)
+    def discover(self) -> set[str]:
+        if self.names is None:
+            self.names = {name for name in file.list_dir(self.path) if file.is_dir(f"{self.path}/{name}") and self.pattern.fullmatch(name)}
+        return self.names
+
+    # Exists
+    def exists(self, name: str) -> bool:
+        return name in self.discover()
+
+    # Get (returns the open server of the list, opens it on first access, none, if the list does not exist, is used by another process or its snapshot is unreadable)
+    def get(self, name: str) -> Server | None:
+
+        # Check for closed
+        if self.closed:
+            return None
+
+        # Return the open server and update its memory
+        server = self.servers.get(name)
+        if server is not None:
+            self.hits += 1
+            self.servers.move_to_end(name)
+            self.used[name] = time.bench_time()
+            self.account(name, server)
+            self.evict()
+            return server
+
+        # Check the name
+        if name not in self.discover():
+            return None
+
+        # Open the server after it is closed completely
+        self.misses += 1
+        server = self.open_server(name, self.closing.pop(name, None))
+        if server is not None:
+            self.add(name, server)
+        return server
+
+    # Open (returns the server like get, but waits for the closing and the opening of the server in the executor, so the event loop never waits for the disk)
+    async def open(self, name: str) -> Server | None:
+
+        # Return the open server
+        if self.closed or name in self.servers or name not in self.discover():
+            return self.get(name)
+
+        # Open the server once, the sessions asking for it meanwhile wait for the same opening, which is not cancelled with one of them
+        opening = self.opening.get(name)
+        if opening is None:
+            opening = self.opening[name] = asyncio.get_running_loop().create_task(self.load(name))
+        return await asyncio.shield(opening)
+
+    # Load (opens the server in the executor and adds it)
+    async def load(self, name: str) -> Server | None:
+        try:
+
+            # Open the server
+            self.misses += 1
+            loop = asyncio.get_running_loop()
+            server = await loop.run_in_executor(None, self.open_server, name, self.closing.pop(name, None))
+            if server is None:
+                return None
+
+            # Close the server again, if the manager closed meanwhile
+            if self.closed:
+                await loop.run_in_executor(None, server.close)
+                return None
+
+            # Add the server
+            self.add(name, server)
+            return server
+
+        finally:
+            del self.opening[name]
+
+    # Open server (waits until the server is closed completely and opens it, none, if it is used by another process or its snapshot is unreadable)
+    def open_server(self, name: str, closing: th.Thread | None) -> Server | None:
+        if closing is not None:
+            closing.join()
+        try:
+            server = Server(f"{self.path}/{name}", self.commit_delay, self.snapshot_records, self.journal_size)
+        except (OSError, ValueError):
+            return None
+        server.listener = self.listener
+        return server
+
+    # Add (adds the server as the most recently used one and evicts others, if needed)
+    def add(self, name: str, server: Server) -> None:
+        self.servers[name] = server
+        self.used[name] = time.bench_time()
+        self.account(name, server)
+        self.evict()
+
+    # Create (creates a new list, returns false, if the name is invalid or taken, the list is opened on first access)
+    def create(self, name: str) -> bool:
+        if self.closed or not self.pattern.fullmatch(name) or name in self.discover():
+            return False
+        file.make_dir(f"{self.path}/{name}")
+        self.names.add(name)
+        return True
+
+    # Account (updates the estimated memory of an open server)
+    def account(self, name: str, server: Server) -> None:
+        memory = server.memory()
+        self.total_memory += memory - self.memory.get(name, 0)
+        self.memory[name] = memory
+
+    # Evict (closes the least recently used servers over the limits and the idle ones, the most recently used one is always kept)
+    def evict(self) -> None:
+        now = time.bench_time()
+        while len(self.servers) > 1:
+            name = next(iter(self.servers))
+            if self.total_memory <= self.memory_budget and len(self.servers) <= self.max_open and now - self.used[name] < self.idle_time:
+                break
+            self.close_server(name)
+            self.evictions += 1
+
+    # Close server (flushes and closes the server in the background)
+    def close_server(self, name: str) -> None:
+        for closed_name in [closed_name for closed_name, thread in self.closing.items() if not thread.is_alive()]:
+            del self.closing[closed_name]
+        server = self.servers.pop(name)
+        self.total_memory -= self.memory.pop(name)
+        del self.used[name]
+        self.closing[name] = th.Thread(target=server.close, name=f"List Close Thread ({name})")
+        self.closing[name].start()
+
+    # Close (flushes and closes all servers, no list can be opened afterwards)
+    def close(self) -> None:
+        self.closed = True
+        for name in tuple(self.servers):
+            self.close_server(name)
+        for thread in self.closing.values():
+            thread.join()
+        self.closing.clear()
+
+    # Shutdown (closes all servers like close, but waits for them in the executor, so the event loop never waits for the disk)
+    async def shutdown(self) -> None:
+        self.closed = True
+        for name in tuple(self.servers):
+            self.close_server(name)
+        closing = tuple(self.closing.values())
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [thread.join() for thread in closing])
+        self.closing.clear()
@@ -1,10 +1,157 @@
 # IMPORTS
+from concurrent.futures import Future
+from collections import deque
+from functools import partial
+from typing import Callable, Iterator
+import json
+from constants import *
+from server.list import ShoppingList
+from server import snapshot
+from server.snapshot import ListSnapshot
 from utils import file
+from utils.wal import WriteAheadLog
 
 
 # CLASSES
 
-# Server
+# Server (one shopping list, persisted in its own directory with a write-ahead log and memory mapped snapshots)
 class Server:
-    pass
 
+    # CONSTRUCTOR
+    def __init__(self, path: str, commit_delay: float = WAL_COMMIT_DELAY, snapshot_records: int = WAL_SNAPSHOT_RECORDS, journal_size: int = LIST_JOURNAL_SIZE) -> None:
+
+        # Set the directory, the name and the count of records between snapshots
+        self.path = path
+        self.name = file.name(path)
+        self.snapshot_records = snapshot_records
+
+        # Define the journal of the latest mutation records with their revisions and the listener, which is called after every change
+        self.journal: deque[tuple[int, list]] = deque(maxlen=journal_size)
+        self.listener: Callable[["Server"], None] | None = None
+
+        # Define the list, which is loaded on first use, the mapped snapshot, the write-ahead log and the count of records since the last snapshot
+        self.loaded: ShoppingList | None = None
+        self.snapshot_view: ListSnapshot | None = None
+        self.wal = WriteAheadLog(path, commit_delay)
+        self.pending = 0
+
+        # Map the last snapshot, the list is only loaded now, if there are records after it, an unreadable snapshot closes the log again
+        data, records = self.wal.recover()
+        if data is not None:
+            try:
+                self.snapshot_view = ListSnapshot(data)
+            except ValueError:
+                self.wal.close()
+                raise
+        for record in records:
+            if self.shopping_list.apply(record):
+                self.journal.append((self.shopping_list.revision, record))
+        self.pending = len(records)
+
+        # Start the write-ahead log
+        self.wal.start()
+
+
+    # PROPERTIES
+
+    # Shopping list (loads the items of the snapshot on first use)
+    @property
+    def shopping_list(self) -> ShoppingList:
+        if self.loaded is None:
+            self.loaded = ShoppingList()
+            if self.snapshot_view is not None:
+                self.loaded.load(self.snapshot_view)
+                self.snapshot_view = None
+        return self.loaded
+
+    # Revision
+    @property
+    def revision(self) -> int:
+        if self.loaded is None and self.snapshot_view is not None:
+            return self.snapshot_view.revision
+        return self.shopping_list.revision
+
+
+    # METHODS
+
+    # Count
+    def count(self) -> int:
+        if self.loaded is None and self.snapshot_view is not None:
+            return len(self.snapshot_view)
+        return len(self.shopping_list)
+
+    # Item (returns the id, name, category, amount and checked state, decodes only this item, if the list is not loaded)
+    def item(self, id: int) -> tuple[int, str, str, int, bool] | None:
+        if self.loaded is None and self.snapshot_view is not None:
+            return self.snapshot_view.get(id)
+        item = self.shopping_list.get(id)
+        return (item.id, item.name, item.category, item.amount, item.checked) if item is not None else None
+
+    # Items (in list order, decodes the items one by one, if the list is not loaded)
+    def items(self) -> Iterator[tuple[int, str, str, int, bool]]:
+        if self.loaded is None and self.snapshot_view is not None:
+            return iter(self.snapshot_view)
+        return ((item.id, item.name, item.category, item.amount, item.checked) for item in self.shopping_list)
+
+    # Memory (returns the estimated memory of the list, a mapped snapshot only costs the touched pages)
+    def memory(self) -> int:
+        if self.loaded is None:
+            return LIST_BASE_SIZE
+        return LIST_BASE_SIZE + len(self.loaded) * LIST_ITEM_SIZE
+
+    # Execute (applies and logs a mutation record, returns the future of its group commit or none, if it is invalid)
+    def execute(self, record: list) -> Future | None:
+
+        # Apply the record
+        if not self.shopping_list.apply(record):
+            return None
+
+        # Journal and log the record and compact the log, if needed
+        self.journal.append((self.shopping_list.revision, record))
+        future = self.wal.append(record)
+        self.pending += 1
+        if self.pending >= self.snapshot_records:
+            self.snapshot()
+
+        # Tell the listener and return the future
+        if self.listener is not None:
+            self.listener(self)
+        return future
+
+    # Changes (returns the mutation records after the revision or none, if the journal does not reach back to it)
+    def changes(self, revision: int) -> list[list] | None:
+
+        # Check the revision against the journal
+        current = self.revision
+        if revision == current:
+            return []
+        if revision > current or not self.journal or self.journal[0][0] > revision + 1:
+            return None
+
+        # Collect the records from the newest back to the revision
+        records = []
+        for record_revision, record in reversed(self.journal):
+            if record_revision <= revision:
+                break
+            records.append(record)
+        records.reverse()
+        return records
+
+    # Sync (returns the changes after the revision or the full list, if there are no changes to send, as compact json)
+    def sync(self, revision: int) -> bytes:
+        changes = self.changes(revision)
+        if changes is not None:
+            return json.dumps({"revision": self.revision, "changes": changes}, separators=(",", ":")).encode("utf-8")
+        return json.dumps({"revision": self.revision, "items": list(self.items())}, separators=(",", ":")).encode("utf-8")
+
+    # Snapshot (compacts the log in the background, only the rows are copied here, they are encoded by the write-ahead log thread)
+    def snapshot(self) -> Future:
+        self.pending = 0
+        shopping_list = self.shopping_list
+        return self.wal.checkpoint(partial(snapshot.encode, shopping_list.rows(), shopping_list.next_id, shopping_list.revision))
+
+    # Close
+    def close(self) -> None:
+        if self.pending:
+            self.snapshot()
+        self.wal.close()
@@ -0,0 +1,120 @@
+# IMPORTS
+from typing import Iterator
+import struct
+import sys
+from constants import *
+
+
+# VARIABLES
+
+# Header (magic, version, item count, next id, revision, string pool offset)
+HEADER = struct.Struct("<4sH2xIQQI")
+
+# Item row (id, name offset, category offset, amount, checked), the rows are in list order
+ROW = struct.Struct("<IIIiB3x")
+
+# Id index entry (id, row), the entries are sorted by id
+INDEX = struct.Struct("<II")
+
+# String length
+LENGTH = struct.Struct("<I")
+
+
+# CLASSES
+
+# List snapshot (decodes the items of a binary snapshot lazily, the buffer is usually a memory map)
+class ListSnapshot:
+
+    # CONSTRUCTOR
+    def __init__(self, buffer: bytes | memoryview) -> None:
+
+        # Set the buffer
+        self.buffer = buffer
+
+        # Read and check the header
+        if len(buffer) < HEADER.size:
+            raise ValueError("Truncated list snapshot")
+        magic, version, self.count, self.next_id, self.revision, self.pool_offset = HEADER.unpack_from(buffer)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VER:
+            raise ValueError("Invalid list snapshot")
+
+        # Define the offset of the id index and check, that the rows and the id index fit before the string pool and the pool fits into the buffer
+        self.index_offset = HEADER.size + self.count * ROW.size
+        if not self.index_offset + self.count * INDEX.size <= self.pool_offset <= len(buffer):
+            raise ValueError("Truncated list snapshot")
+
+        # Define the decoded categories
+        self.categories: dict[int, str] = {}
+
+
+    # METHODS
+
+    # Length
+    def __len__(self) -> int:
+        return self.count
+
+    # Iterate (in list order)
+    def __iter__(self) -> Iterator[tuple[int, str, str, int, bool]]:
+        for row in range(self.count):
+            yield self.row(row)
+
+    # Row (returns the id, name, category, amount and checked state of a row)
+    def row(self, row: int) -> tuple[int, str, str, int, bool]:
+        id, name, category, amount, checked = ROW.unpack_from(self.buffer, HEADER.size + row * ROW.size)
+        return id, self.string(name), self.category(category), amount, checked != 0
+
+    # Get (binary search in the id index)
+    def get(self, id: int) -> tuple[int, str, str, int, bool] | None:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_id, row = INDEX.unpack_from(self.buffer, self.index_offset + middle * INDEX.size)
+            if entry_id == id:
+                return self.row(row)
+            if entry_id < id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    # String
+    def string(self, offset: int) -> str:
+        start = self.pool_offset + offset + LENGTH.size
+        return str(self.buffer[start:start + LENGTH.unpack_from(self.buffer, start - LENGTH.size)[0]], "utf-8")
+
+    # Category (categories are few and cached)
+    def category(self, offset: int) -> str:
+        category = self.categories.get(offset)
+        if category is None:
+            category = self.categories[offset] = sys.intern(self.string(offset))
+        return category
+
+
+# FUNCTIONS
+
+# Encode (returns the binary snapshot of the items in list order, equal strings are stored once)
+def encode(items: list[tuple[int, str, str, int, bool]], next_id: int, revision: int) -> bytes:
+
+    # Build the string pool
+    strings: dict[str, int] = {}
+    pool = bytearray()
+    for item in items:
+        for string in (item[1], item[2]):
+            if string not in strings:
+                strings[string] = len(pool)
+                data = string.encode("utf-8")
+                pool += LENGTH.pack(len(data)) + data
+
+    # Build the item table and the id index
+    count = len(items)
+    data = bytearray(HEADER.size + count * (ROW.size + INDEX.size))
+    HEADER.pack_into(data, 0, SNAPSHOT_MAGIC, SNAPSHOT_VER, count, next_id, revision, len(data))
+    for row, (id, name, category, amount, checked) in enumerate(items):
+        ROW.pack_into(data, HEADER.size + row * ROW.size, id, strings[name], strings[category], amount, checked)
+    index_offset = HEADER.size + count * ROW.size
+    for position, (id, row) in enumerate(sorted((item[0], row) for row, item in enumerate(items))):
+        INDEX.pack_into(data, index_offset + position * INDEX.size, id, row)
+
+    # Return the snapshot
+    data += pool
+    return bytes(data)
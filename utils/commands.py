@@ -0,0 +1,216 @@
+# IMPORTS
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable
+import asyncio
+import cProfile
+import traceback
+from utils import logging
+from utils import time
+from utils.connection import Connection
+
+
+# VARIABLES
+
+# Converters of the argument types, text takes the rest of the command
+CONVERTERS = {"str": None, "int": int, "float": float}
+
+
+# CLASSES
+
+# Session (the state of one client session)
+class Session:
+
+    # CONSTRUCTOR
+    def __init__(self, key: bytes, connection: Connection, subscriber: Any = None) -> None:
+
+        # Set the session key, the connection and the subscriber
+        self.key = key
+        self.connection = connection
+        self.subscriber = subscriber
+
+        # Define the profile, which is enabled around the frames of the session, while it is profiled
+        self.profile: cProfile.Profile | None = None
+
+        # Define the close message, the queued replies with their size, a batch is queued as the list of its replies, and the commits of the changes with their replies, which wait for them
+        self.close_msg = ""
+        self.replies: list[bytes | list[bytes]] = []
+        self.queued_size = 0
+        self.commits: list[tuple[Future, bytes]] = []
+
+        # Define the task serving the session and whether it waits for the next frame, an idle session is closed at once on a restart
+        self.task: asyncio.Task | None = None
+        self.idle = False
+
+
+# Command (a handler with its compiled argument parser)
+class Command:
+
+    # CONSTRUCTOR
+    def __init__(self, name: str, handler: Callable[..., Awaitable[bytes | None]], schema: str = "", mutating: bool = False, sequential: bool = False) -> None:
+
+        # Set the name, the handler, the schema and the concurrency hints, mutating commands hold the lock, sequential ones only run alone in a batch
+        self.name = name
+        self.handler = handler
+        self.schema = schema
+        self.mutating = mutating
+        self.sequential = sequential or mutating
+
+        # Compile the parser and build the usage
+        self.parse = compile_schema(schema)
+        self.usage = " ".join([name] + [parameter_usage(parameter) for parameter in schema.split()])
+
+
+# Registry (dispatches commands to the registered handlers, mutating commands of all sessions run one after another)
+class Registry:
+
+    # CONSTRUCTOR
+    def __init__(self, logger: logging.Logger) -> None:
+
+        # Set the logger
+        self.logger = logger
+
+        # Define the commands, the timing hooks and the lock of the mutating commands
+        self.commands: dict[str, Command] = {}
+        self.hooks: list[Callable[[str, int], None]] = []
+        self.lock = asyncio.Lock()
+
+
+    # METHODS
+
+    # Register (the schema lists the arguments as name:type, optional ones in brackets, the types are str, int, float and text for the rest)
+    def register(self, name: str, handler: Callable[..., Awaitable[bytes | None]], schema: str = "", mutating: bool = False, sequential: bool = False) -> Command:
+        command = self.commands[name.lower()] = Command(name.lower(), handler, schema, mutating, sequential)
+        return command
+
+    # Add hook (the hook is called with the command name and its duration in nanoseconds)
+    def add_hook(self, hook: Callable[[str, int], None]) -> None:
+        self.hooks.append(hook)
+
+    # Remove hook
+    def remove_hook(self, hook: Callable[[str, int], None]) -> None:
+        self.hooks.remove(hook)
+
+    # Execute (runs one decoded command, returns its reply or none, if the session closes)
+    async def execute(self, session: Session, command: str) -> bytes | None:
+        self.logger.info("Command issued: {}", command)
+        return await self.run(session, command.strip().split(" "))
+
+    # Execute batch (runs the commands in order, consecutive concurrent commands run together, returns the replies until a command closes the session)
+    async def execute_batch(self, session: Session, commands: list[str]) -> list[bytes]:
+
+        # Run the commands in groups of concurrent commands and single sequential commands
+        replies = []
+        group = []
+        for command in commands:
+            if not command:
+                continue
+            self.logger.info("Command issued: {}", command)
+            arguments = command.strip().split(" ")
+            entry = self.commands.get(arguments[0].lower())
+            if entry is not None and entry.sequential:
+                if not await self.run_group(session, group, replies) or not await self.run_group(session, [arguments], replies):
+                    return replies
+                group = []
+                continue
+            group.append(arguments)
+        await self.run_group(session, group, replies)
+        return replies
+
+    # Run group (runs a group of commands concurrently, adds their replies in order, returns false, if a command closes the session)
+    async def run_group(self, session: Session, group: list[list[str]], replies: list[bytes]) -> bool:
+
+        # Run a single command directly
+        if len(group) == 1:
+            reply = await self.run(session, group[0])
+            if reply is None:
+                return False
+            replies.append(reply)
+            return True
+
+        # Run the commands concurrently and keep the replies before the first closing command, failing commands reply with an error in run, so one never cancels the others
+        for reply in await asyncio.gather(*(self.run(session, arguments) for arguments in group)):
+            if reply is None:
+                return False
+            replies.append(reply)
+        return True
+
+    # Run (parses the arguments and runs the handler, mutating commands hold the lock)
+    async def run(self, session: Session, arguments: list[str]) -> bytes | None:
+
+        # Look up the command and parse the arguments
+        command = self.commands.get(arguments[0].lower())
+        if command is None:
+            return "Invalid command! Type 'help' for more information ...".encode("utf-8")
+        try:
+            values = command.parse(arguments)
+        except ValueError:
+            return f"Invalid arguments! Usage: {command.usage} ...".encode("utf-8")
+
+        # Run the handler, it is only timed, if there are hooks, a failing handler is logged and replies with an error, the session stays open
+        start = time.bench_time_ns() if self.hooks else 0
+        try:
+            if command.mutating:
+                async with self.lock:
+                    reply = await command.handler(session, *values)
+            else:
+                reply = await command.handler(session, *values)
+        except Exception as e:
+            self.logger.error("Command '{}' failed! {!r}", " ".join(arguments), e)
+            self.logger.debug("{}", traceback.format_exc().rstrip())
+            reply = f"Command failed! {type(e).__name__} ...".encode("utf-8")
+        if self.hooks:
+            duration = time.bench_time_ns() - start
+            for hook in self.hooks:
+                hook(command.name, duration)
+        return reply
+
+
+# FUNCTIONS
+
+# Compile schema (generates a parser for the schema, which checks the argument count and converts the arguments without interpreting the schema per call)
+def compile_schema(schema: str) -> Callable[[list[str]], tuple]:
+
+    # Read the parameters
+    required, optional, rest = [], [], False
+    for parameter in schema.split():
+        name, _, kind = parameter.strip("[]").partition(":")
+        kind = kind or "str"
+        if rest:
+            raise ValueError(f"Parameter after the text parameter in schema '{schema}'")
+        if kind == "text":
+            if optional:
+                raise ValueError(f"Text parameter after an optional parameter in schema '{schema}'")
+            rest = True
+        elif kind not in CONVERTERS:
+            raise ValueError(f"Invalid type '{kind}' in schema '{schema}'")
+        elif parameter.startswith("["):
+            optional.append(kind)
+        elif optional:
+            raise ValueError(f"Required parameter after an optional parameter in schema '{schema}'")
+        else:
+            required.append(kind)
+
+    # Build the expressions of the values
+    values = [f"{kind}(arguments[{index}])" if CONVERTERS[kind] else f"arguments[{index}]" for index, kind in enumerate(required, 1)]
+    for index, kind in enumerate(optional, len(required) + 1):
+        values.append(f"({kind}(arguments[{index}]) if length > {index} else None)" if CONVERTERS[kind] else f"(arguments[{index}] if length > {index} else None)")
+    if rest:
+        values.append(f"' '.join(arguments[{len(required) + 1}:])")
+
+    # Build the check of the argument count
+    minimum = len(required) + 1 + rest
+    maximum = len(required) + len(optional) + 1
+    check = f"length < {minimum}" if rest else f"length < {minimum} or length > {maximum}"
+
+    # Compile the parser
+    source = f"def parse(arguments):\n    length = len(arguments)\n    if {check}:\n        raise ValueError('Invalid argument count')\n    return ({''.join(value + ', ' for value in values)})\n"
+    namespace = {"int": int, "float": float}
+    exec(source, namespace)
+    return namespace["parse"]
+
+
+# Parameter usage
+def parameter_usage(parameter: str) -> str:
+    name, _, kind = parameter.strip("[]").partition(":")
+    usage = f"<{name}...>" if kind == "text" else f"<{name}>"
+    return f"[{usage}]" if parameter.startswith("[") else usage
@@ -0,0 +1,73 @@
+# IMPORTS
+import zlib
+from constants import *
+
+
+# VARIABLES
+
+# Frame flags (the first byte of every frame of a compressed session)
+FLAG_RAW = b"\x00"
+FLAG_DEFLATE = b"\x01"
+
+# Tail of every sync flush, it is not sent
+SYNC_TAIL = b"\x00\x00\xff\xff"
+
+
+# CLASSES
+
+# Compressor (compresses the frames of one connection in both directions with streaming raw deflate contexts, so repeated strings compress across frames)
+class Compressor:
+
+    # CONSTRUCTOR
+    def __init__(self, level: int = COMPRESSION_LEVEL, threshold: int = COMPRESSION_THRESHOLD, max_size: int = CONTROL_MAX_FRAME_SIZE) -> None:
+
+        # Set the size threshold and the maximum decompressed size
+        self.threshold = threshold
+        self.max_size = max_size
+
+        # Define the streaming contexts, the frames must be decompressed in the order they were compressed
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        self.decompressor = zlib.decompressobj(-15)
+
+        # Define the counters of the sent data before and after the compression
+        self.raw_size = 0
+        self.compressed_size = 0
+
+
+    # METHODS
+
+    # Compress (frames below the threshold are sent raw)
+    def compress(self, data: bytes) -> bytes:
+
+        # Send small frames raw
+        if len(data) < self.threshold:
+            return FLAG_RAW + data
+
+        # Compress and flush the frame, the context keeps its window for the next frames
+        compressed = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.raw_size += len(data)
+        self.compressed_size += len(compressed) - len(SYNC_TAIL)
+        return FLAG_DEFLATE + compressed[:-len(SYNC_TAIL)]
+
+    # Decompress (raises a value error, if the frame is invalid or larger than the maximum size)
+    def decompress(self, data: bytes) -> bytes:
+
+        # Return raw frames
+        flag = data[:1]
+        if flag == FLAG_RAW:
+            return data[1:]
+        if flag != FLAG_DEFLATE:
+            raise ValueError("Invalid frame flag")
+
+        # Decompress the frame
+        try:
+            decompressed = self.decompressor.decompress(data[1:] + SYNC_TAIL, self.max_size)
+        except zlib.error as error:
+            raise ValueError(f"Invalid compressed frame: {error}")
+        if self.decompressor.unconsumed_tail:
+            raise ValueError("Decompressed frame too large")
+        return decompressed
+
+    # Ratio (returns the compressed size per raw size of the compressed frames)
+    def ratio(self) -> float:
+        return self.compressed_size / self.raw_size if self.raw_size else 1.0
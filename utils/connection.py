@@ -0,0 +1,283 @@
+# IMPORTS
+from typing import Awaitable, Callable
+import asyncio
+from constants import *
+from utils import metrics
+from utils.compression import Compressor
+
+
+# VARIABLES
+
+# Bytes received and sent by all connections
+BYTES_IN = metrics.counter("bytes.in")
+BYTES_OUT = metrics.counter("bytes.out")
+
+
+# CLASSES
+
+# Framed connection
+class Connection(asyncio.BufferedProtocol):
+
+    # CONSTRUCTOR
+    def __init__(self, handler: Callable[["Connection"], Awaitable[None]], max_frame_size: int = CONTROL_MAX_FRAME_SIZE) -> None:
+
+        # Set the handler and the maximum frame size
+        self.handler = handler
+        self.max_frame_size = max_frame_size
+
+        # Define the receive buffer, the unread data lies between start and end
+        self.buffer = bytearray(CONTROL_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+        # Define the transport, the address, the handler task and the compressor of the session
+        self.transport: asyncio.Transport | None = None
+        self.ip = ""
+        self.port = 0
+        self.task: asyncio.Task | None = None
+        self.compressor: Compressor | None = None
+
+        # Define the read and write state
+        self.closed = False
+        self.reading_paused = False
+        self.writing_paused = False
+        self.read_waiter: asyncio.Future | None = None
+        self.drain_waiter: asyncio.Future | None = None
+
+
+    # PROTOCOL METHODS
+
+    # Connection made
+    def connection_made(self, transport: asyncio.Transport) -> None:
+
+        # Set the transport and the address
+        self.transport = transport
+        self.ip, self.port = transport.get_extra_info("peername")[:2]
+
+        # Start the handler task
+        self.task = asyncio.get_running_loop().create_task(self.handler(self))
+
+    # Get buffer
+    def get_buffer(self, sizehint: int) -> memoryview:
+
+        # Move the unread data to the front, if the tail is full
+        if self.end == len(self.buffer):
+            if self.start > 0:
+                self.compact()
+            else:
+                self.grow(len(self.buffer) * 2)
+
+        # Return the free tail of the buffer
+        return self.view[self.end:]
+
+    # Buffer updated
+    def buffer_updated(self, nbytes: int) -> None:
+
+        # Advance the end of the unread data
+        self.end += nbytes
+        BYTES_IN.value += nbytes
+
+        # Stop reading, if a full frame and its header are already buffered
+        if not self.reading_paused and self.end - self.start > self.max_frame_size + CONTROL_FRAME_HEADER_SIZE:
+            self.reading_paused = True
+            self.transport.pause_reading()
+
+        # Wake up the reader
+        self.wake_reader()
+
+    # EOF received
+    def eof_received(self) -> bool:
+
+        # Wake up the reader and let the transport close itself
+        self.closed = True
+        self.wake_reader()
+        return False
+
+    # Connection lost
+    def connection_lost(self, exc: Exception | None) -> None:
+
+        # Mark the connection as closed and wake up all waiters
+        self.closed = True
+        self.wake_reader()
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_exception(ConnectionResetError("Connection lost"))
+
+    # Pause writing
+    def pause_writing(self) -> None:
+        self.writing_paused = True
+
+    # Resume writing
+    def resume_writing(self) -> None:
+
+        # Wake up the writer
+        self.writing_paused = False
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_result(None)
+
+
+    # METHODS
+
+    # Read exactly (the returned view is only valid until the next await on this connection)
+    async def read_exactly(self, size: int) -> memoryview:
+
+        # Check the size
+        if size < 0:
+            raise ValueError(f"Invalid read size {size}")
+
+        # Wait until enough data is buffered
+        while self.end - self.start < size:
+            if self.closed:
+                raise asyncio.IncompleteReadError(bytes(self.view[self.start:self.end]), size)
+            self.reserve(size)
+            await self.wait()
+
+        # Consume and return the data
+        return self.consume(size)
+
+    # Read until (the returned view is only valid until the next await on this connection)
+    async def read_until(self, separator: bytes, limit: int) -> memoryview:
+
+        # Wait until the separator is buffered
+        index = -1
+        while index < 0:
+            index = self.buffer.find(separator, self.start, self.end)
+            if index >= 0:
+                break
+            if self.end - self.start > limit:
+                raise asyncio.LimitOverrunError("Separator not found within the limit", self.end - self.start)
+            if self.closed:
+                raise asyncio.IncompleteReadError(bytes(self.view[self.start:self.end]), None)
+            self.reserve(self.end - self.start + len(separator))
+            await self.wait()
+
+        # Consume and return the data including the separator
+        return self.consume(index + len(separator) - self.start)
+
+    # Read frame (the returned view is only valid until the next await on this connection)
+    async def read_frame(self) -> memoryview:
+
+        # Read and check the header with the frame size
+        length = int(bytes(await self.read_exactly(CONTROL_FRAME_HEADER_SIZE)))
+        if length < 0 or length > self.max_frame_size:
+            raise ValueError(f"Invalid frame size {length}")
+
+        # Read the frame
+        return await self.read_exactly(length)
+
+    # Write
+    def write(self, *parts: bytes) -> None:
+
+        # Hand all parts to the transport at once
+        if self.closed or self.transport.is_closing():
+            raise ConnectionResetError("Connection closed")
+        self.transport.writelines(parts)
+        BYTES_OUT.value += sum(map(len, parts))
+
+    # Write frame
+    def write_frame(self, data: bytes) -> None:
+
+        # Write the header and the frame in one call
+        self.write(b"%016d" % len(data), data)
+
+    # Write frames (writes the headers and frames in one call)
+    def write_frames(self, frames: list[bytes]) -> None:
+        parts = []
+        for data in frames:
+            parts.append(b"%016d" % len(data))
+            parts.append(data)
+        self.write(*parts)
+
+    # Frame ready (returns true, if the next frame is buffered completely, an invalid header counts as ready, so it is read and rejected)
+    def frame_ready(self) -> bool:
+        if self.end - self.start < CONTROL_FRAME_HEADER_SIZE:
+            return False
+        try:
+            length = int(bytes(self.view[self.start:self.start + CONTROL_FRAME_HEADER_SIZE]))
+        except ValueError:
+            return True
+        return self.end - self.start >= CONTROL_FRAME_HEADER_SIZE + length
+
+    # Drain
+    async def drain(self) -> None:
+
+        # Raise, if the connection is gone
+        if self.closed:
+            raise ConnectionResetError("Connection lost")
+
+        # Wait until the transport accepts data again, all writers of the connection share one waiter
+        if self.writing_paused:
+            if self.drain_waiter is None or self.drain_waiter.done():
+                self.drain_waiter = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self.drain_waiter)
+
+    # Close
+    def close(self) -> None:
+
+        # Close the transport
+        if self.transport is not None:
+            self.transport.close()
+
+    # Wait
+    async def wait(self) -> None:
+
+        # Resume reading, because the reader needs more data
+        if self.reading_paused:
+            self.reading_paused = False
+            self.transport.resume_reading()
+
+        # Wait for the next data
+        self.read_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.read_waiter
+        finally:
+            self.read_waiter = None
+
+    # Wake reader
+    def wake_reader(self) -> None:
+        if self.read_waiter is not None and not self.read_waiter.done():
+            self.read_waiter.set_result(None)
+
+    # Consume
+    def consume(self, size: int) -> memoryview:
+
+        # Take the data from the front of the unread data
+        data = self.view[self.start:self.start + size]
+        self.start += size
+
+        # Reuse the buffer from the front, if everything is read, a buffer grown for a large frame is replaced by one of the default size
+        if self.start == self.end:
+            self.start = self.end = 0
+            if len(self.buffer) > CONTROL_BUFFER_SIZE:
+                self.buffer = bytearray(CONTROL_BUFFER_SIZE)
+                self.view = memoryview(self.buffer)
+
+        # Return the data
+        return data
+
+    # Reserve
+    def reserve(self, size: int) -> None:
+
+        # Grow or compact the buffer, if the unread data would not fit behind the start
+        if size > len(self.buffer):
+            self.grow(size)
+        elif self.start + size > len(self.buffer):
+            self.compact()
+
+    # Compact
+    def compact(self) -> None:
+
+        # Move the unread data to the front of the buffer
+        length = self.end - self.start
+        self.buffer[:length] = self.buffer[self.start:self.end]
+        self.start, self.end = 0, length
+
+    # Grow
+    def grow(self, size: int) -> None:
+
+        # Replace the buffer with a larger one, views of the old buffer stay valid
+        buffer = bytearray(size)
+        length = self.end - self.start
+        buffer[:length] = self.view[self.start:self.end]
+        self.buffer, self.view = buffer, memoryview(buffer)
+        self.start, self.end = 0, length
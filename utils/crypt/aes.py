@@ -1,33 +1,137 @@
 # IMPORTS
+from typing import IO, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA256
 from Crypto import Random
 from constants import *
 from utils import file
+from utils import metrics
+from utils import time
+import mmap
+import os
 import secrets
 import string
+import struct
+
+
+# VARIABLES
+
+# Durations of the encryption and decryption of whole frames
+ENCRYPT_TIME = metrics.histogram("aes.encrypt")
+DECRYPT_TIME = metrics.histogram("aes.decrypt")
+
+
+# CLASSES
+
+# Encryptor
+class Encryptor:
+
+    # CONSTRUCTOR
+    def __init__(self, key: bytes, data_size: int, iv: bytes | None = None) -> None:
+
+        # Set the data size and define the cipher
+        self.data_size = data_size
+        self.iv = iv if iv is not None else Random.new().read(16)
+        self.cipher = AES.new(key, AES.MODE_CFB, self.iv)
+
+        # Define the header and the fed size
+        self.header = str(data_size).zfill(16).encode("utf-8") + self.iv
+        self.fed_size = 0
+
+
+    # METHODS
+
+    # Feed (writes into output, if given, which must have the length of data)
+    def feed(self, data: bytes, output: memoryview | bytearray | None = None) -> bytes | None:
+
+        # Check the size
+        self.fed_size += len(data)
+        if self.fed_size > self.data_size:
+            raise ValueError("More data fed than announced in the header")
+
+        # Encrypt the data, CFB is a stream mode and needs no padding
+        return self.cipher.encrypt(data, output=output)
+
+    # Finalize
+    def finalize(self) -> None:
+
+        # Check the size
+        if self.fed_size != self.data_size:
+            raise ValueError(f"Announced {self.data_size} bytes, but fed {self.fed_size} bytes")
+
+
+# Decryptor
+class Decryptor:
+
+    # CONSTRUCTOR
+    def __init__(self, key: bytes, max_size: int | None = None) -> None:
+
+        # Set the key and the largest accepted data size, the size in the header is chosen by the sender
+        self.key = key
+        self.max_size = max_size
+
+        # Define the header, the cipher, the data size and the remaining size
+        self.header = bytearray()
+        self.cipher = None
+        self.data_size = -1
+        self.remaining_size = 0
+
+
+    # METHODS
+
+    # Feed (writes into output, if given, which must have the length of the returned plaintext)
+    def feed(self, data: bytes, output: memoryview | bytearray | None = None) -> bytes | None:
+
+        # Read the header first
+        data = memoryview(data)
+        if self.cipher is None:
+            missing = AES_HEADER_SIZE - len(self.header)
+            self.header += data[:missing]
+            data = data[missing:]
+            if len(self.header) < AES_HEADER_SIZE:
+                return b"" if output is None else None
+            self.data_size = self.remaining_size = int(bytes(self.header[:16]))
+            if self.data_size < 0 or (self.max_size is not None and self.data_size > self.max_size):
+                raise ValueError(f"Invalid data size {self.data_size} in the header")
+            self.cipher = AES.new(self.key, AES.MODE_CFB, bytes(self.header[16:]))
+
+        # Decrypt the data and drop the padding of older senders
+        data = data[:self.remaining_size]
+        self.remaining_size -= len(data)
+        return self.cipher.decrypt(data, output=output)
+
+    # Finalize
+    def finalize(self) -> None:
+
+        # Check the size
+        if self.cipher is None or self.remaining_size > 0:
+            raise ValueError("Encrypted data is incomplete")
 
 
 # METHODS
 
 # Encrypt bytes
-def encrypt_bytes(key: bytes, data: bytes) -> bytes:
-    data_size = str(len(data)).zfill(16).encode("utf-8")
-    iv = Random.new().read(16)
-    cipher = AES.new(key, AES.MODE_CFB, iv)
-    output = data_size + iv
-    index = 0
-    while True:
-        chunk = data[index:index + AES_CHUNK_SIZE]
-        if len(chunk) == 0:
-            break
-        if len(chunk) % 16 != 0:
-            chunk += b' ' * (16 - (len(chunk) % 16))
-        output += cipher.encrypt(chunk)
-        index += AES_CHUNK_SIZE
+def encrypt_bytes(key: bytes, data: bytes) -> bytearray:
+    start = time.bench_time_ns()
+    encryptor = Encryptor(key, len(data))
+    output = bytearray(AES_HEADER_SIZE + len(data))
+    output[:AES_HEADER_SIZE] = encryptor.header
+    encryptor.feed(data, memoryview(output)[AES_HEADER_SIZE:])
+    encryptor.finalize()
+    ENCRYPT_TIME.record(time.bench_time_ns() - start)
     return output
 
 
+# Encrypt stream
+def encrypt_stream(key: bytes, data_size: int, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    encryptor = Encryptor(key, data_size)
+    yield encryptor.header
+    for chunk in chunks:
+        yield encryptor.feed(chunk)
+    encryptor.finalize()
+
+
 # Encrypt file
 def encrypt_file(key: bytes, file_path: str):
     file_size = str(file.file_size(file_path)).zfill(16).encode("utf-8")
@@ -48,23 +152,31 @@ def encrypt_file(key: bytes, file_path: str):
     out_file.close()
 
 
-# Decrypt bytes
-def decrypt_bytes(key: bytes, data: bytes) -> bytes:
-    output = b''
-    data_size = int(data[0:16])
-    iv = data[16:32]
-    cipher = AES.new(key, AES.MODE_CFB, iv)
-    index = 32
-    while True:
-        chunk = data[index:index + AES_CHUNK_SIZE]
-        if len(chunk) == 0:
-            break
-        output += cipher.decrypt(chunk)
-        index += AES_CHUNK_SIZE
-    output = output[:data_size]
+# Decrypt bytes (rejects a header announcing more data than given, before the output is allocated)
+def decrypt_bytes(key: bytes, data: bytes) -> bytearray:
+    start = time.bench_time_ns()
+    if len(data) < AES_HEADER_SIZE:
+        raise ValueError("Encrypted data is incomplete")
+    decryptor = Decryptor(key, len(data) - AES_HEADER_SIZE)
+    data = memoryview(data)
+    decryptor.feed(data[:AES_HEADER_SIZE])
+    output = bytearray(decryptor.data_size)
+    decryptor.feed(data[AES_HEADER_SIZE:AES_HEADER_SIZE + decryptor.data_size], memoryview(output))
+    decryptor.finalize()
+    DECRYPT_TIME.record(time.bench_time_ns() - start)
     return output
 
 
+# Decrypt stream
+def decrypt_stream(key: bytes, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    decryptor = Decryptor(key)
+    for chunk in chunks:
+        output = decryptor.feed(chunk)
+        if output:
+            yield output
+    decryptor.finalize()
+
+
 # Decrypt file
 def decrypt_file(key: bytes, file_path: str):
     in_file = file.open_binary(file_path, "rb")
@@ -78,6 +190,74 @@ def decrypt_file(key: bytes, file_path: str):
             break
         out_file.write(cipher.decrypt(chunk))
     out_file.truncate(file_size)
+    in_file.close()
+    out_file.close()
+
+
+# Encrypt file parallel (seekable CTR format, see decrypt_file_range)
+def encrypt_file_parallel(key: bytes, file_path: str, workers: int | None = None) -> None:
+    data_size = file.file_size(file_path)
+    nonce = Random.new().read(8)
+    header = AES_CTR_MAGIC + nonce + struct.pack(">Q", data_size)
+    with file.open_binary(file_path, "rb") as in_file, file.open_binary(f"{file.directory(file_path)}/encrypted-{file.name(file_path)}", "w+b") as out_file:
+        out_file.write(header)
+        out_file.truncate(AES_CTR_HEADER_SIZE + data_size)
+        if data_size == 0:
+            return
+        with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as in_map, mmap.mmap(out_file.fileno(), 0, access=mmap.ACCESS_WRITE) as out_map:
+            with memoryview(in_map) as source, memoryview(out_map) as target:
+                _crypt_ctr_regions(key, nonce, source, target[AES_CTR_HEADER_SIZE:], workers)
+            out_map.flush()
+
+
+# Decrypt file parallel (the header is checked, before the output file is created)
+def decrypt_file_parallel(key: bytes, file_path: str, workers: int | None = None) -> None:
+    with file.open_binary(file_path, "rb") as in_file:
+        nonce, data_size = _read_ctr_header(in_file)
+        with file.open_binary(f"{file.directory(file_path)}/{''.join(file.name(file_path).split('-')[1:])}", "w+b") as out_file:
+            out_file.truncate(data_size)
+            if data_size == 0:
+                return
+            with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as in_map, mmap.mmap(out_file.fileno(), 0, access=mmap.ACCESS_WRITE) as out_map:
+                with memoryview(in_map) as source, memoryview(out_map) as target:
+                    _crypt_ctr_regions(key, nonce, source[AES_CTR_HEADER_SIZE:AES_CTR_HEADER_SIZE + data_size], target, workers)
+                out_map.flush()
+
+
+# Decrypt file range
+def decrypt_file_range(key: bytes, file_path: str, offset: int, length: int) -> bytes:
+    with file.open_binary(file_path, "rb") as in_file:
+        nonce, data_size = _read_ctr_header(in_file)
+        offset = max(0, min(offset, data_size))
+        length = max(0, min(length, data_size - offset))
+        if length == 0:
+            return b""
+        block_offset = offset - offset % 16
+        in_file.seek(AES_CTR_HEADER_SIZE + block_offset)
+        cipher = AES.new(key, AES.MODE_CTR, nonce=nonce, initial_value=block_offset // 16)
+        return cipher.decrypt(in_file.read(offset + length - block_offset))[offset - block_offset:]
+
+
+# Read ctr header (returns the nonce and the data size, raises, if the file is shorter than announced, like a truncated backup)
+def _read_ctr_header(in_file: IO) -> tuple[bytes, int]:
+    header = in_file.read(AES_CTR_HEADER_SIZE)
+    if len(header) != AES_CTR_HEADER_SIZE or header[:len(AES_CTR_MAGIC)] != AES_CTR_MAGIC:
+        raise ValueError("Not a file in the seekable AES format")
+    data_size = struct.unpack(">Q", header[16:24])[0]
+    if os.fstat(in_file.fileno()).st_size < AES_CTR_HEADER_SIZE + data_size:
+        raise ValueError("The file is shorter than announced in the header")
+    return header[8:16], data_size
+
+
+# Crypt ctr regions (pycryptodome releases the GIL, so the regions run in parallel)
+def _crypt_ctr_regions(key: bytes, nonce: bytes, source: memoryview, target: memoryview, workers: int | None) -> None:
+    def crypt_region(start: int) -> None:
+        end = min(start + AES_REGION_SIZE, len(source))
+        cipher = AES.new(key, AES.MODE_CTR, nonce=nonce, initial_value=start // 16)
+        cipher.encrypt(source[start:end], output=target[start:end])
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        for _ in executor.map(crypt_region, range(0, len(source), AES_REGION_SIZE)):
+            pass
 
 
 # Get key
@@ -0,0 +1,64 @@
+# IMPORTS
+import os
+from constants import *
+from utils import time
+from utils.crypt import rsa, x25519
+
+
+# CLASSES
+
+# Key cache
+class KeyCache:
+
+    # CONSTRUCTOR
+    def __init__(self, private_key_path: str, public_key_path: str, x25519_key_path: str) -> None:
+
+        # Set the key paths
+        self.paths = (private_key_path, public_key_path, x25519_key_path)
+
+        # Define the modification times and the time of the last check
+        self.modification_times: tuple[int, ...] = ()
+        self.checked = 0.0
+
+        # Load the keys
+        self.load()
+
+
+    # METHODS
+
+    # Load
+    def load(self) -> None:
+
+        # Import the keys
+        self.modification_times = self.stat()
+        self.private_key = rsa.import_key_from_file(self.paths[0])
+        self.public_key = rsa.import_key_from_file(self.paths[1])
+        self.x25519_key = x25519.import_key_from_file(self.paths[2])
+
+        # Serialize the public key once
+        self.public_key_bytes = rsa.export_key_to_bytes(self.public_key)
+
+        # Serialize the private keys for the handshake workers, which keep their own ciphers
+        self.worker_args = (rsa.export_key_to_bytes(self.private_key), self.x25519_key.export_key(format="DER"))
+
+    # Refresh (reloads the keys, if the key files changed, and returns true in that case)
+    def refresh(self) -> bool:
+
+        # Check the files at most once per interval
+        now = time.abs_time()
+        if now - self.checked < KEY_CHECK_INTERVAL:
+            return False
+        self.checked = now
+
+        # Reload the keys, if any file changed
+        try:
+            if self.stat() == self.modification_times:
+                return False
+            self.load()
+        except (OSError, ValueError, IndexError, TypeError):
+            return False
+        return True
+
+    # Stat
+    def stat(self) -> tuple[int, ...]:
+        return tuple(os.stat(path).st_mtime_ns for path in self.paths)
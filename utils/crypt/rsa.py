@@ -43,6 +43,12 @@ def export_key_to_bytes(key: RSA.RsaKey) -> bytes:
     return data
 
 
+# Get cipher
+def get_cipher(key: RSA.RsaKey) -> PKCS1_OAEP.PKCS1OAEP_Cipher:
+    cipher = PKCS1_OAEP.new(key)
+    return cipher
+
+
 # Encrypt bytes
 def encrypt_bytes(public_key: RSA.RsaKey, data: bytes) -> bytes:
     cipher = PKCS1_OAEP.new(public_key)
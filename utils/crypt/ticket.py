@@ -0,0 +1,106 @@
+# IMPORTS
+from Crypto.Cipher import AES
+from Crypto.Hash import HMAC, SHA256
+import secrets
+import struct
+from utils import time
+
+
+# CLASSES
+
+# Resumption tickets
+class Tickets:
+
+    # CONSTRUCTOR
+    def __init__(self, lifetime: float, rotation: float) -> None:
+
+        # Set the ticket lifetime and the key rotation interval
+        self.lifetime = lifetime
+        self.rotation = rotation
+
+        # Define the ticket keys by key id and the current key id
+        self.keys: dict[bytes, tuple[bytes, float]] = {}
+        self.key_id = b""
+
+        # Define the counters
+        self.issued = 0
+        self.hits = 0
+        self.misses = 0
+        self.expiries = 0
+
+
+    # METHODS
+
+    # Issue (a ticket is the key id, the nonce, the encrypted secret and issue time and the tag)
+    def issue(self, secret: bytes) -> bytes:
+
+        # Rotate the keys, if needed
+        self.rotate()
+
+        # Encrypt the secret and the issue time with the current key
+        nonce = secrets.token_bytes(12)
+        cipher = AES.new(self.keys[self.key_id][0], AES.MODE_GCM, nonce=nonce)
+        cipher.update(self.key_id)
+        data, tag = cipher.encrypt_and_digest(secret + struct.pack(">d", time.abs_time()))
+
+        # Count and return the ticket
+        self.issued += 1
+        return self.key_id + nonce + data + tag
+
+    # Open (returns the resumption secret or none, if the ticket is invalid or expired)
+    def open(self, ticket: bytes) -> bytes | None:
+
+        # Rotate the keys, if needed
+        self.rotate()
+
+        # Find the key and decrypt the ticket
+        key = self.keys.get(ticket[:4])
+        if key is None or len(ticket) < 4 + 12 + 8 + 16:
+            self.misses += 1
+            return None
+        cipher = AES.new(key[0], AES.MODE_GCM, nonce=ticket[4:16])
+        cipher.update(ticket[:4])
+        try:
+            data = cipher.decrypt_and_verify(ticket[16:-16], ticket[-16:])
+        except ValueError:
+            self.misses += 1
+            return None
+
+        # Check the issue time
+        if struct.unpack(">d", data[-8:])[0] + self.lifetime < time.abs_time():
+            self.expiries += 1
+            return None
+
+        # Count and return the secret
+        self.hits += 1
+        return data[:-8]
+
+    # Rotate
+    def rotate(self) -> None:
+
+        # Create a new current key, if the current one is too old
+        now = time.abs_time()
+        if self.key_id not in self.keys or self.keys[self.key_id][1] + self.rotation <= now:
+            self.key_id = secrets.token_bytes(4)
+            self.keys[self.key_id] = (secrets.token_bytes(32), now)
+
+        # Drop keys, which cannot have issued an unexpired ticket anymore
+        for key_id, (_, created) in tuple(self.keys.items()):
+            if created + self.rotation + self.lifetime < now:
+                del self.keys[key_id]
+
+    # Export (returns the ticket keys as json data, so a new process can open the issued tickets)
+    def export(self) -> dict:
+        return {"key_id": self.key_id.hex(), "keys": {key_id.hex(): [key.hex(), created] for key_id, (key, created) in self.keys.items()}}
+
+    # Load (loads exported ticket keys)
+    def load(self, data: dict) -> None:
+        self.keys = {bytes.fromhex(key_id): (bytes.fromhex(key), created) for key_id, (key, created) in data["keys"].items()}
+        self.key_id = bytes.fromhex(data["key_id"])
+
+
+# FUNCTIONS
+
+# Resumption secret
+def resumption_secret(session_key: bytes) -> bytes:
+    return HMAC.new(session_key, b"resumption", SHA256).digest()
@@ -0,0 +1,60 @@
+# IMPORTS
+import threading as th
+from utils.crypt import rsa, aes, x25519
+
+
+# VARIABLES
+
+# Server keys of this worker
+_private_key: rsa.RSA.RsaKey | None = None
+_x25519_key: x25519.ECC.EccKey | None = None
+_x25519_public_key = b""
+
+# Ready-made ciphers of this worker, one per thread
+_local = th.local()
+
+
+# METHODS
+
+# Initialize (runs once in every worker, keys are passed as bytes, because they cannot be pickled)
+def initialize(private_key: bytes, x25519_key: bytes) -> None:
+    global _private_key, _x25519_key, _x25519_public_key, _local
+    _private_key = rsa.import_key_from_bytes(private_key)
+    _local = th.local()
+    _x25519_key = x25519.ECC.import_key(x25519_key)
+    _x25519_public_key = x25519.export_public_key_to_bytes(_x25519_key)
+
+
+# Rsa challenge (encrypts the aes password with the client key)
+def rsa_challenge(client_key: bytes, password: str) -> bytes:
+    return rsa.encrypt_bytes(rsa.import_key_from_bytes(client_key), password.encode("utf-8"))
+
+
+# Rsa response (returns the aes session key, if the response holds the aes password)
+def rsa_response(response: bytes, password: str) -> bytes | None:
+    cipher = getattr(_local, "cipher", None)
+    if cipher is None:
+        cipher = _local.cipher = rsa.get_cipher(_private_key)
+    if cipher.decrypt(response).decode("utf-8") != password:
+        return None
+    return aes.get_key(password)
+
+
+# X25519 ephemeral (returns the ephemeral private key and the server public keys)
+def x25519_ephemeral() -> tuple[bytes, bytes]:
+    ephemeral_key = x25519.generate_private_key()
+    return ephemeral_key.export_key(format="DER"), _x25519_public_key + x25519.export_public_key_to_bytes(ephemeral_key)
+
+
+# X25519 keys (combines the secrets of the client key with the server ephemeral and static key)
+def x25519_keys(ephemeral_key: bytes, client_key: bytes, transcript: bytes, context: bytes) -> tuple[bytes, bytes]:
+    client_key = x25519.import_public_key_from_bytes(client_key)
+    secret = x25519.shared_secret(x25519.ECC.import_key(ephemeral_key), client_key) + x25519.shared_secret(_x25519_key, client_key)
+    return x25519.derive_keys(secret, transcript, context)
+
+
+# X25519 exchange (generates the ephemeral key, the client key is already known, returns the server public keys and the derived keys)
+def x25519_exchange(client_key: bytes, transcript: bytes, context: bytes) -> tuple[bytes, bytes, bytes]:
+    ephemeral_key, server_keys = x25519_ephemeral()
+    key, confirmation_key = x25519_keys(ephemeral_key, client_key, transcript + client_key + server_keys, context)
+    return server_keys, key, confirmation_key
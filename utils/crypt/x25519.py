@@ -0,0 +1,57 @@
+# IMPORTS
+from Crypto.PublicKey import ECC
+from Crypto.Protocol.DH import key_agreement, import_x25519_public_key
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Hash import HMAC, SHA256
+from utils import file
+
+
+# METHODS
+
+# Generate private key
+def generate_private_key() -> ECC.EccKey:
+    key = ECC.generate(curve="Curve25519")
+    return key
+
+
+# Import key from file
+def import_key_from_file(file_path: str) -> ECC.EccKey:
+    with file.open_binary(file_path, "rb") as f:
+        key = ECC.import_key(f.read())
+    return key
+
+
+# Export key to file
+def export_key_to_file(file_path: str, key: ECC.EccKey) -> None:
+    with file.open_binary(file_path, "wb") as f:
+        f.write(key.export_key(format="PEM").encode("utf-8"))
+
+
+# Import public key from bytes
+def import_public_key_from_bytes(data: bytes) -> ECC.EccKey:
+    key = import_x25519_public_key(bytes(data))
+    return key
+
+
+# Export public key to bytes
+def export_public_key_to_bytes(key: ECC.EccKey) -> bytes:
+    data = key.public_key().export_key(format="raw")
+    return data
+
+
+# Shared secret
+def shared_secret(private_key: ECC.EccKey, public_key: ECC.EccKey) -> bytes:
+    secret = key_agreement(static_priv=private_key, static_pub=public_key, kdf=lambda secret: secret)
+    return secret
+
+
+# Derive keys (returns the aes session key and the confirmation key)
+def derive_keys(secret: bytes, transcript: bytes, context: bytes) -> tuple[bytes, bytes]:
+    keys = HKDF(secret, 64, SHA256.new(transcript).digest(), SHA256, context=context)
+    return keys[:32], keys[32:]
+
+
+# Confirmation tag
+def confirmation_tag(confirmation_key: bytes, role: bytes, transcript: bytes) -> bytes:
+    tag = HMAC.new(confirmation_key, role + transcript, SHA256).digest()
+    return tag
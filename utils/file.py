@@ -4,6 +4,10 @@
 from typing import IO
 import os
 import json
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
 
 
 # FUNCTIONS
@@ -111,3 +115,17 @@ def directory(path: str) -> str:
 # File size
 def file_size(path: str) -> int:
     return os.path.getsize(path)
+
+
+# Lock (returns the open lock file, which holds the lock until it is closed, or none, if another process holds the lock)
+def lock(path: str) -> IO | None:
+    file = open_binary(path, "ab")
+    try:
+        if os.name == "nt":
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        return None
+    return file
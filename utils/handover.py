@@ -0,0 +1,62 @@
+# IMPORTS
+import json
+import os
+import subprocess as sp
+import sys
+from constants import *
+
+
+# FUNCTIONS
+
+# Start (starts the new process with the listening socket, returns the new process and the pipe, which gets readable, when it is ready or failed)
+def start(args: list[str], listen_fd: int, state: dict) -> tuple[sp.Popen, int]:
+
+    # Create the state pipe to the new process and the ready pipe from the new process
+    state_read, state_write = os.pipe()
+    ready_read, ready_write = os.pipe()
+
+    # Start the new process, it inherits the listening socket and the pipe ends
+    env = dict(os.environ)
+    env[CONTROL_HANDOVER_ENV] = f"{listen_fd},{state_read},{ready_write}"
+    try:
+        process = sp.Popen([sys.executable, *args], env=env, pass_fds=(listen_fd, state_read, ready_write))
+    except OSError:
+        for fd in (state_read, state_write, ready_read, ready_write):
+            os.close(fd)
+        raise
+
+    # Close the pipe ends of the new process
+    os.close(state_read)
+    os.close(ready_write)
+
+    # Send the state
+    with os.fdopen(state_write, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    # Return the new process and the ready pipe
+    return process, ready_read
+
+
+# Load (returns the state of the old process with the listening socket and the ready pipe, or none, if this is no handover)
+def load() -> dict | None:
+
+    # Read the file descriptors
+    value = os.environ.pop(CONTROL_HANDOVER_ENV, "")
+    if not value:
+        return None
+    listen_fd, state_fd, ready_fd = (int(fd) for fd in value.split(","))
+
+    # Read the state
+    with os.fdopen(state_fd, "r", encoding="utf-8") as f:
+        state = json.load(f)
+
+    # Return the state
+    state["listen_fd"] = listen_fd
+    state["ready_fd"] = ready_fd
+    return state
+
+
+# Ready (tells the old process, that the new one is listening)
+def ready(ready_fd: int) -> None:
+    os.write(ready_fd, b"1")
+    os.close(ready_fd)
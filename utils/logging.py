@@ -1,46 +1,62 @@
 # IMPORTS
 from typing import IO
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import shutil
+import sys
 import threading as th
 from constants import *
+from utils import file
+from utils import metrics
 from utils import time
 
 
+# VARIABLES
+
+# Durations of the batch writes of the background writer
+WRITE_TIME = metrics.histogram("log.write")
+
+
 # CLASSES
 
 # Logger
 class Logger:
 
     # CONSTRUCTOR
-    def __init__(self, lock: th.Lock, domain: str, level: int, log_file: IO = None) -> None:
+    def __init__(self, lock: th.Lock, domain: str, level: int, log_file: IO = None, writer: "Writer" = None, json_lines: bool = False) -> None:
 
-        # Set lock, domain, level and log file
+        # Set lock, domain, level, log file, writer and the log file format
         self.lock = lock
         self.domain = domain
         self.level = level
         self.log_file = log_file
+        self.writer = writer
+        self.json_lines = json_lines
 
 
     # METHODS
 
     # Debug
-    def debug(self, message: str):
+    def debug(self, message: str, *args):
         if self.level <= LOG_DEBUG:
-            self._out(f"[{time.datetime_f1()}] [{self.domain}] [{LOG_LEVEL_NAMES[LOG_DEBUG]}] {message}\n")
+            self._log(LOG_DEBUG, message, args)
 
     # Info
-    def info(self, message: str):
+    def info(self, message: str, *args):
         if self.level <= LOG_INFO:
-            self._out(f"[{time.datetime_f1()}] [{self.domain}] [{LOG_LEVEL_NAMES[LOG_INFO]}] {message}\n")
+            self._log(LOG_INFO, message, args)
 
     # Warning
-    def warning(self, message: str):
+    def warning(self, message: str, *args):
         if self.level <= LOG_WARNING:
-            self._out(f"[{time.datetime_f1()}] [{self.domain}] [{LOG_LEVEL_NAMES[LOG_WARNING]}] {message}\n")
+            self._log(LOG_WARNING, message, args)
 
     # Error
-    def error(self, message: str):
+    def error(self, message: str, *args):
         if self.level <= LOG_ERROR:
-            self._out(f"[{time.datetime_f1()}] [{self.domain}] [{LOG_LEVEL_NAMES[LOG_ERROR]}] {message}\n")
+            self._log(LOG_ERROR, message, args)
 
     # Custom
     def custom(self, text: str):
@@ -50,8 +66,26 @@ class Logger:
     def blank_line(self, count: int = 1):
         self._out("\n" * count)
 
-    # Out
-    def _out(self, text: str):
+    # Log (the message is formatted with the arguments only here or in the background writer)
+    def _log(self, level: int, message: str, args: tuple):
+
+        # Hand the record to the background writer, if available
+        record = (time.abs_time(), self.domain, level, message, args)
+        if self.writer:
+            self.writer.write(record)
+            return
+
+        # Format and write the record, json log files get the record as json line
+        text = format_text(record)
+        self._out(text, format_json(record) if self.json_lines else text)
+
+    # Out (plain texts are not written to json log files)
+    def _out(self, text: str, file_text: str | None = None):
+
+        # Hand the text to the background writer, if available
+        if self.writer:
+            self.writer.write(text)
+            return
 
         # Lock all other threads
         self.lock.acquire()
@@ -60,17 +94,275 @@ class Logger:
         print(text, end="")
 
         # Write the text to the log file
-        if self.log_file:
-            self.log_file.write(text)
+        if file_text is None and not self.json_lines:
+            file_text = text
+        if self.log_file and file_text:
+            self.log_file.write(file_text)
 
         # Release all other threads
         self.lock.release()
 
 
+# Background writer
+class Writer(th.Thread):
+
+    # CONSTRUCTOR
+    def __init__(self, log_file: IO = None, size: int = LOG_QUEUE_SIZE, block: bool = False, json_lines: bool = False) -> None:
+
+        # Initialize the thread
+        th.Thread.__init__(self, name="Log Writer Thread", daemon=True)
+
+        # Set the log file, the queue size, the queue policy and the log file format
+        self.log_file = log_file
+        self.size = size
+        self.block = block
+        self.json_lines = json_lines
+
+        # Define the queue, the count of dropped records and the wake up event
+        self.queue: deque[str | tuple | None] = deque()
+        self.dropped = 0
+        self.waiting = False
+        self.wake_up = th.Event()
+
+
+    # METHODS
+
+    # Write (only enqueues the text or record, drops or blocks, if the queue is full, never blocks for a stopped writer)
+    def write(self, text: str | tuple | None) -> None:
+
+        # Apply the queue policy, if the queue is full
+        while len(self.queue) >= self.size:
+            if not self.block or not self.is_alive():
+                self.dropped += 1
+                return
+            time.sleep(0.001)
+
+        # Enqueue the text and wake up the writer, if it sleeps
+        self.queue.append(text)
+        if self.waiting:
+            self.wake_up.set()
+
+    # Run
+    def run(self) -> None:
+
+        # Writing loop
+        while True:
+
+            # Sleep until the next record arrives
+            if not self.queue:
+                self.wake_up.clear()
+                self.waiting = True
+                if not self.queue:
+                    self.wake_up.wait()
+                self.waiting = False
+
+            # Take all waiting records
+            texts = []
+            try:
+                while len(texts) < LOG_BATCH_SIZE:
+                    texts.append(self.queue.popleft())
+            except IndexError:
+                pass
+
+            # Report dropped records
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                texts.append((time.abs_time(), f"{NAME} - LOG", LOG_WARNING, "Dropped {} log records, because the queue was full!", (dropped,)))
+
+            # Format and write the batch, a failing batch is reported and lost, but never stops the writer
+            try:
+
+                # Format the batch, plain texts are not written to json log files
+                console_texts, file_texts = [], []
+                for text in texts:
+                    if text is None:
+                        continue
+                    if type(text) == str:
+                        console_texts.append(text)
+                        if not self.json_lines:
+                            file_texts.append(text)
+                        continue
+                    console_texts.append(format_text(text))
+                    file_texts.append(format_json(text) if self.json_lines else console_texts[-1])
+
+                # Write the batch at once
+                start = time.bench_time_ns()
+                sys.stdout.write("".join(console_texts))
+                sys.stdout.flush()
+                if self.log_file:
+                    self.log_file.write("".join(file_texts))
+                    self.log_file.flush()
+                WRITE_TIME.record(time.bench_time_ns() - start)
+
+            except Exception as e:
+                sys.stderr.write(f"Failed to write {len(texts)} log records: {e!r}\n")
+
+            # Stop, if requested
+            if None in texts:
+                break
+
+    # Close (writes all enqueued records and stops the thread)
+    def close(self) -> None:
+        if self.is_alive():
+            self.queue.append(None)
+            self.wake_up.set()
+            self.join()
+
+
+# Rotating log file
+class RotatingFile:
+
+    # CONSTRUCTOR
+    def __init__(self, directory: str, header: str = "", size: int = LOG_ROTATE_SIZE, interval: float = LOG_ROTATE_INTERVAL, files: int = LOG_RETAIN_FILES, total_size: int = LOG_RETAIN_SIZE, compress: bool = True, active: tuple[str, ...] = ()) -> None:
+
+        # Set the directory, the files still written by other processes, the header of every file, the rotation limits, the retention limits and compression
+        self.directory = directory
+        self.active = active
+        self.header = header
+        self.size = size
+        self.interval = interval
+        self.files = files
+        self.total_size = total_size
+        self.compress = compress
+
+        # Define the current file, its path, its written size and its rotation time
+        self.file: IO | None = None
+        self.path = ""
+        self.written = 0
+        self.rotate_at = 0.0
+
+        # Define the time stamp and the index of the current file name
+        self.stamp = ""
+        self.index = 0
+
+        # Define the background compressor
+        self.compressor = ThreadPoolExecutor(1, "Log Compressor Thread")
+
+        # Open the first file
+        self.open()
+
+        # Compress the files of earlier runs and apply the retention
+        for path in self.rotated():
+            if self.compress and path.endswith(".txt"):
+                self.compressor.submit(self.compress_file, path)
+        self.compressor.submit(self.retain)
+
+
+    # METHODS
+
+    # Write (rotates only between writes, so a record or batch is never split)
+    def write(self, text: str) -> None:
+
+        # Rotate the file, if it is too large or too old
+        if (0 < self.size <= self.written) or (0 < self.interval and self.rotate_at <= time.abs_time()):
+            self.rotate()
+
+        # Write the text
+        self.file.write(text)
+        self.written += len(text)
+
+    # Flush
+    def flush(self) -> None:
+        self.file.flush()
+
+    # Close (compresses the current file too, if requested, and waits for the background compression)
+    def close(self, compress: bool = False) -> None:
+        self.file.close()
+        if compress and self.compress:
+            self.compressor.submit(self.compress_file, self.path)
+        self.compressor.shutdown()
+
+    # Open
+    def open(self) -> None:
+
+        # Find a free file name, files rotated within the same second get an increasing index
+        stamp = time.datetime_f2()
+        self.index = self.index + 1 if stamp == self.stamp else 0
+        self.stamp = stamp
+        while True:
+            path = f"{self.directory}/server_log_{stamp}_{self.index:06d}.txt" if self.index else f"{self.directory}/server_log_{stamp}.txt"
+            if not file.exist(path) and not file.exist(f"{path}.gz"):
+                break
+            self.index += 1
+
+        # Open the file and write the header
+        self.file = file.open_text(path, "w")
+        self.path = path
+        self.file.write(self.header)
+        self.written = len(self.header)
+        self.rotate_at = time.abs_time() + self.interval
+
+    # Rotate
+    def rotate(self) -> None:
+
+        # Switch to a new file
+        path = self.path
+        self.file.close()
+        self.open()
+
+        # Compress the old file and apply the retention in the background
+        if self.compress:
+            self.compressor.submit(self.compress_file, path)
+        self.compressor.submit(self.retain)
+
+    # Rotated (returns all rotated files, newest first)
+    def rotated(self) -> list[str]:
+        paths = []
+        for element in file.list_dir(self.directory):
+            path = f"{self.directory}/{element}"
+            if element.startswith("server_log_") and (element.endswith(".txt") or element.endswith(".txt.gz")) and path != self.path and path not in self.active and file.is_file(path):
+                paths.append(path)
+        paths.sort(reverse=True)
+        return paths
+
+    # Compress file (runs in the background compressor)
+    def compress_file(self, path: str) -> None:
+        try:
+            with file.open_binary(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+                shutil.copyfileobj(source, target, 1048576)
+            file.delete(path)
+        except OSError:
+            pass
+
+    # Retain (deletes the oldest rotated files, which exceed the count or total size, runs in the background compressor)
+    def retain(self) -> None:
+        count, total_size = 0, 0
+        for path in self.rotated():
+            try:
+                count += 1
+                total_size += file.file_size(path)
+                if count > self.files or total_size > self.total_size:
+                    file.delete(path)
+            except OSError:
+                pass
+
+
 # FUNCTIONS
 
+# Format message
+def format_message(message: str, args: tuple) -> str:
+    if not args:
+        return message
+    try:
+        return message.format(*args)
+    except Exception:
+        return f"{message} {args!r}"
+
+
+# Format text
+def format_text(record: tuple) -> str:
+    timestamp, domain, level, message, args = record
+    return f"[{time.datetime_f1_cached(timestamp)}] [{domain}] [{LOG_LEVEL_NAMES[level]}] {format_message(message, args)}\n"
+
+
+# Format json
+def format_json(record: tuple) -> str:
+    timestamp, domain, level, message, args = record
+    return json.dumps({"time": timestamp, "domain": domain, "level": LOG_LEVEL_NAMES[level], "message": format_message(message, args)}) + "\n"
+
+
 # Log main
 def log_main(message: str, level: int) -> None:
 
     # Print the log to the console
-    print(f"[{time.datetime_f1()}] [{NAME} - MAIN] [{LOG_LEVEL_NAMES[level]}] {message}")
+    print(f"[{time.datetime_f1_cached()}] [{NAME} - MAIN] [{LOG_LEVEL_NAMES[level]}] {message}")
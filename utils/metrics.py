@@ -0,0 +1,128 @@
+# IMPORTS
+import os
+from constants import *
+from utils import file
+
+
+# VARIABLES
+
+# Histograms and counters of the process, recording happens without locks, so concurrent threads may rarely lose a count
+HISTOGRAMS: dict[str, "Histogram"] = {}
+COUNTERS: dict[str, "Counter"] = {}
+
+
+# CLASSES
+
+# Histogram (hdr-style log-linear buckets, every power of two is split into equal sub-buckets, so the relative error is bounded by the precision)
+class Histogram:
+
+    # Slots
+    __slots__ = ("precision", "shift_bits", "counts", "total")
+
+    # CONSTRUCTOR
+    def __init__(self, precision: int = METRICS_PRECISION) -> None:
+
+        # Set the precision in bits, values below 2^precision are exact
+        self.precision = precision
+        self.shift_bits = precision - 1
+
+        # Define the counts of the buckets up to 2^64 and the sum of the values
+        self.counts = [0] * ((66 - precision) << self.shift_bits)
+        self.total = 0
+
+
+    # METHODS
+
+    # Record (one index computation and one increment, the value must not be negative)
+    def record(self, value: int) -> None:
+        shift = value.bit_length() - self.precision
+        if shift > 0:
+            self.counts[(shift << self.shift_bits) + (value >> shift)] += 1
+        else:
+            self.counts[value] += 1
+        self.total += value
+
+    # Value (returns the lowest value of a bucket)
+    def value(self, index: int) -> int:
+        if index < 1 << self.precision:
+            return index
+        shift = (index >> self.shift_bits) - 1
+        return (index - (shift << self.shift_bits)) << shift
+
+    # Count
+    def count(self) -> int:
+        return sum(self.counts)
+
+    # Percentiles (returns the lowest values of the buckets, which contain the percentiles, in one pass)
+    def percentiles(self, fractions: tuple[float, ...]) -> list[int]:
+
+        # Find the ranks
+        count = self.count()
+        ranks = [max(1, int(count * fraction + 0.5)) for fraction in fractions]
+        values = [0] * len(fractions)
+
+        # Walk the buckets
+        seen, position = 0, 0
+        for index, bucket in enumerate(self.counts):
+            if not bucket:
+                continue
+            seen += bucket
+            while position < len(ranks) and seen >= ranks[position]:
+                values[position] = self.value(index)
+                position += 1
+            if position == len(ranks):
+                break
+        return values
+
+    # Summary (returns the count, the mean and the percentiles)
+    def summary(self) -> dict:
+        count = self.count()
+        p50, p90, p99, p999, maximum = self.percentiles((0.5, 0.9, 0.99, 0.999, 1.0))
+        return {"count": count, "mean": self.total // count if count else 0, "p50": p50, "p90": p90, "p99": p99, "p999": p999, "max": maximum}
+
+    # Clear
+    def clear(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+
+
+# Counter
+class Counter:
+
+    # Slots
+    __slots__ = ("value",)
+
+    # CONSTRUCTOR
+    def __init__(self) -> None:
+        self.value = 0
+
+
+# FUNCTIONS
+
+# Histogram (returns the histogram of the name, creates it on first use)
+def histogram(name: str) -> Histogram:
+    if name not in HISTOGRAMS:
+        HISTOGRAMS[name] = Histogram()
+    return HISTOGRAMS[name]
+
+
+# Counter (returns the counter of the name, creates it on first use)
+def counter(name: str) -> Counter:
+    if name not in COUNTERS:
+        COUNTERS[name] = Counter()
+    return COUNTERS[name]
+
+
+# Snapshot (returns the values of all counters and the summaries of all used histograms, the durations are in nanoseconds)
+def snapshot() -> dict:
+    return {
+        "counters": {name: counter.value for name, counter in sorted(COUNTERS.items())},
+        "histograms": {name: histogram.summary() for name, histogram in sorted(HISTOGRAMS.items()) if histogram.count()},
+    }
+
+
+# Dump (replaces the file atomically, so readers never see a partial file)
+def dump(path: str, data: dict) -> None:
+    file.save_json(f"{path}.tmp", data)
+    os.replace(f"{path}.tmp", path)
+
@@ -0,0 +1,165 @@
+# IMPORTS
+from typing import Any
+import asyncio
+import cProfile
+import io
+import sys
+import threading as th
+import tracemalloc
+import traceback
+from constants import *
+from utils import file
+from utils import logging
+from utils import time
+
+
+# CLASSES
+
+# Profiler (profiles the event loop thread for a time window or the commands of one session, only one profile runs at a time, nothing is hooked while it is off)
+class Profiler:
+
+    # CONSTRUCTOR
+    def __init__(self, logger: logging.Logger, path: str = PROFILE_PATH) -> None:
+
+        # Set the logger and the directory of the written files
+        self.logger = logger
+        self.path = path
+
+        # Define the running profile, the profiled session, the timer of the time window and the last memory snapshot
+        self.profile: cProfile.Profile | None = None
+        self.session: Any = None
+        self.timer: asyncio.TimerHandle | None = None
+        self.memory_snapshot: tracemalloc.Snapshot | None = None
+
+
+    # METHODS
+
+    # Start (profiles everything the event loop runs, stops after the duration, if given, returns false, if a profile is running)
+    def start(self, duration: float | None = None) -> bool:
+
+        # Check for a running profile
+        if self.profile is not None:
+            return False
+
+        # Start the profile and the timer
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        if duration:
+            self.timer = asyncio.get_running_loop().call_later(duration, self.stop)
+        return True
+
+    # Start session (profiles the commands of the session, which is enabled around its frames, returns false, if a profile is running, the work of other sessions is recorded too, while a command of the session waits in an await)
+    def start_session(self, session: Any) -> bool:
+
+        # Check for a running profile
+        if self.profile is not None:
+            return False
+
+        # Hand the profile to the session
+        self.profile = cProfile.Profile()
+        self.session = session
+        session.profile = self.profile
+        return True
+
+    # Stop (writes the profile as pstats file and returns its path, none, if no profile is running)
+    def stop(self) -> str | None:
+
+        # Check for a running profile
+        if self.profile is None:
+            return None
+
+        # Stop the profile, the timer and the session profile
+        profile, self.profile = self.profile, None
+        profile.disable()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.session is not None:
+            self.session.profile = None
+            self.session = None
+
+        # Write the profile
+        path = self.file_path("profile", "pstats")
+        profile.dump_stats(path)
+        self.logger.info("Profile written to {}.", path)
+        return path
+
+    # Start memory (traces the allocations with the given count of frames, returns false, if tracing already)
+    def start_memory(self, frames: int = 1) -> bool:
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        return True
+
+    # Snapshot memory (writes the top allocations and the difference to the last snapshot, returns the paths, none, if not tracing)
+    def snapshot_memory(self, limit: int = PROFILE_MEMORY_LIMIT) -> list[str] | None:
+
+        # Check for tracing
+        if not tracemalloc.is_tracing():
+            return None
+
+        # Take the snapshot without the allocations of tracemalloc itself
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        current, peak = tracemalloc.get_traced_memory()
+
+        # Write the top allocations
+        paths = [self.file_path("memory", "txt")]
+        lines = [f"Traced memory: {current} bytes, peak: {peak} bytes", ""]
+        lines += [str(statistic) for statistic in snapshot.statistics("lineno")[:limit]]
+        self.write_text(paths[0], lines)
+
+        # Write the difference to the last snapshot
+        if self.memory_snapshot is not None:
+            paths.append(self.file_path("memory_diff", "txt"))
+            self.write_text(paths[1], [str(statistic) for statistic in snapshot.compare_to(self.memory_snapshot, "lineno")[:limit]])
+        self.memory_snapshot = snapshot
+        return paths
+
+    # Stop memory (returns false, if not tracing)
+    def stop_memory(self) -> bool:
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self.memory_snapshot = None
+        return True
+
+    # Dump stacks (writes the stacks of all threads and of all tasks of the event loop, returns the path)
+    def dump_stacks(self) -> str:
+
+        # Format the stacks of the threads
+        names = {thread.ident: thread.name for thread in th.enumerate()}
+        lines = []
+        for ident, frame in sys._current_frames().items():
+            lines.append(f"Thread {names.get(ident, 'Unknown')} ({ident}):")
+            lines += [line.rstrip("\n") for line in traceback.format_stack(frame)]
+            lines.append("")
+
+        # Format the stacks of the tasks
+        for task in asyncio.all_tasks():
+            stack = io.StringIO()
+            task.print_stack(file=stack)
+            lines.append(stack.getvalue())
+
+        # Write the stacks
+        path = self.file_path("stacks", "txt")
+        self.write_text(path, lines)
+        return path
+
+    # File path (returns a free path, files written within the same second get an increasing index)
+    def file_path(self, kind: str, extension: str) -> str:
+        if not file.exist(self.path):
+            file.make_dir(self.path)
+        path = f"{self.path}/{kind}_{time.datetime_f2()}"
+        index = 0
+        while file.exist(f"{path}{f'_{index:06d}' if index else ''}.{extension}"):
+            index += 1
+        return f"{path}{f'_{index:06d}' if index else ''}.{extension}"
+
+
+    # STATIC METHODS
+
+    # Write text
+    @staticmethod
+    def write_text(path: str, lines: list[str]) -> None:
+        with file.open_text(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
@@ -5,6 +5,12 @@ import time as _time
 import datetime as _datetime
 
 
+# VARIABLES
+
+# Cached datetime format 1 with its second
+_datetime_f1_cache = (-1, "")
+
+
 # FUNCTIONS
 
 # Sleep
@@ -47,6 +53,16 @@ def datetime_f1() -> str:
     return _datetime.datetime.now().strftime("%d/%b/%y %H:%M:%S")
 
 
+# Cached datetime format 1 (recomputed at most once per second)
+def datetime_f1_cached(timestamp: float | None = None) -> str:
+    global _datetime_f1_cache
+    second = int(_time.time() if timestamp is None else timestamp)
+    cache = _datetime_f1_cache
+    if cache[0] != second:
+        cache = _datetime_f1_cache = (second, _datetime.datetime.fromtimestamp(second).strftime("%d/%b/%y %H:%M:%S"))
+    return cache[1]
+
+
 # Datetime format 2
 def datetime_f2() -> str:
     return _datetime.datetime.now().strftime("%Yy-%mm-%dd_%Hh-%Mm-%Ss")
@@ -0,0 +1,251 @@
+# IMPORTS
+from concurrent.futures import Future
+from typing import Callable
+import json
+import mmap
+import os
+import struct
+import threading as th
+import zlib
+from constants import *
+from utils import file
+from utils import time
+
+
+# CLASSES
+
+# Write-ahead log (records are appended to numbered segments, a snapshot names the first segment, which is not part of it)
+class WriteAheadLog(th.Thread):
+
+    # CONSTRUCTOR
+    def __init__(self, path: str, commit_delay: float = WAL_COMMIT_DELAY) -> None:
+
+        # Initialize the thread
+        th.Thread.__init__(self, name=f"WAL Thread ({file.name(path)})", daemon=True)
+
+        # Set the directory and the group commit latency budget
+        self.path = path
+        self.commit_delay = commit_delay
+
+        # Define the lock file, the current segment and its file
+        self.lock = None
+        self.segment = 0
+        self.file = None
+
+        # Define the waiting records and checkpoints, the future of the next group commit and the condition
+        self.queue: list[bytes | tuple[int, Callable[[], bytes]] | None] = []
+        self.future: Future = Future()
+        self.condition = th.Condition()
+
+        # Define the counters
+        self.records = 0
+        self.commits = 0
+
+
+    # METHODS
+
+    # Recover (returns the snapshot and the records after it, cuts off a torn tail, must be called before start)
+    def recover(self) -> tuple[memoryview | None, list]:
+
+        # Create the directory and lock it against other processes
+        if not file.exist(self.path):
+            file.make_dir(self.path)
+        self.lock = file.lock(f"{self.path}/lock")
+        if self.lock is None:
+            raise BlockingIOError(f"The log in '{self.path}' is used by another process")
+
+        # Read the snapshot and the first segment, which is not part of it, the list is not opened without its snapshot
+        try:
+            snapshot, first = read_snapshot(f"{self.path}/snapshot.bin")
+        except ValueError:
+            self.lock.close()
+            raise
+
+        # Read the records of all newer segments
+        records = []
+        segments = sorted(int(name[4:-4]) for name in file.list_dir(self.path) if name.startswith("wal_") and name.endswith(".log"))
+        for segment in segments:
+            if segment < first:
+                file.delete(self.segment_path(segment))
+                continue
+            records.extend(read_segment(self.segment_path(segment)))
+
+        # Continue with the last segment, its torn tail is cut off already
+        self.segment = max(segments[-1] if segments else 0, first)
+        self.file = file.open_binary(self.segment_path(self.segment), "ab")
+        sync_dir(self.path)
+
+        # Return the snapshot and the records
+        return snapshot, records
+
+    # Append (returns the future of the group commit, which makes the record durable)
+    def append(self, record: list | tuple) -> Future:
+        data = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        with self.condition:
+            self.queue.append(struct.pack(">II", len(data), zlib.crc32(data)) + data)
+            self.condition.notify()
+            return self.future
+
+    # Checkpoint (encodes and writes the snapshot of all appended records in the background and drops the segments before it)
+    def checkpoint(self, encode: Callable[[], bytes]) -> Future:
+        with self.condition:
+            self.queue.append((self.segment, encode))
+            self.segment += 1
+            self.condition.notify()
+            return self.future
+
+    # Close (commits all waiting records and stops the thread)
+    def close(self) -> None:
+        with self.condition:
+            self.queue.append(None)
+            self.condition.notify()
+        if self.is_alive():
+            self.join()
+        self.file.close()
+        self.lock.close()
+
+    # Run
+    def run(self) -> None:
+
+        # Commit loop
+        while True:
+
+            # Wait for the first record and give other writers the latency budget to join the group commit
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+            if self.commit_delay > 0:
+                time.sleep(self.commit_delay)
+
+            # Take the group
+            with self.condition:
+                queue, self.queue = self.queue, []
+                future, self.future = self.future, Future()
+
+            # Write the group with one sync per segment, write the snapshots and wake up the writers, a failing group fails its future, but never stops the thread
+            stop = False
+            records = []
+            try:
+                for item in queue:
+                    if item is None:
+                        stop = True
+                    elif type(item) == bytes:
+                        records.append(item)
+                    else:
+                        self.write(records)
+                        records = []
+                        self.write_checkpoint(*item)
+                self.write(records)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                self.commits += 1
+                future.set_result(None)
+
+            # Stop, if requested
+            if stop:
+                break
+
+    # Write (writes and syncs the records to the current segment)
+    def write(self, records: list[bytes]) -> None:
+        if records:
+            self.file.write(b"".join(records))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.records += len(records)
+
+    # Write checkpoint (switches to the next segment and encodes and writes the snapshot of all records before it)
+    def write_checkpoint(self, segment: int, encode: Callable[[], bytes]) -> None:
+
+        # Encode the snapshot
+        snapshot = encode()
+
+        # Switch to the next segment
+        self.file.close()
+        self.file = file.open_binary(self.segment_path(segment + 1), "ab")
+
+        # Write the snapshot atomically
+        write_snapshot(f"{self.path}/snapshot.bin", snapshot, segment + 1)
+
+        # Drop the segments in the snapshot
+        for name in file.list_dir(self.path):
+            if name.startswith("wal_") and name.endswith(".log") and int(name[4:-4]) <= segment:
+                file.delete(f"{self.path}/{name}")
+
+    # Segment path
+    def segment_path(self, segment: int) -> str:
+        return f"{self.path}/wal_{segment:08d}.log"
+
+
+# FUNCTIONS
+
+# Read segment (returns the records, cuts off a torn or corrupt tail)
+def read_segment(path: str) -> list[list]:
+
+    # Read the segment
+    with file.open_binary(path, "rb") as f:
+        data = f.read()
+
+    # Parse the records
+    records = []
+    position = 0
+    while position + 8 <= len(data):
+        length, checksum = struct.unpack_from(">II", data, position)
+        record = data[position + 8:position + 8 + length]
+        if len(record) < length or zlib.crc32(record) != checksum:
+            break
+        records.append(json.loads(record))
+        position += 8 + length
+
+    # Cut off the tail
+    if position < len(data):
+        os.truncate(path, position)
+
+    # Return the records
+    return records
+
+
+# Read snapshot (returns the memory mapped snapshot or none and the first segment, which is not part of it, raises, if the snapshot is unreadable, because the segments in it are deleted already)
+def read_snapshot(path: str) -> tuple[memoryview | None, int]:
+
+    # Map the snapshot
+    if not file.exist(path):
+        return None, 0
+    if file.file_size(path) < WAL_SNAPSHOT_HEADER_SIZE:
+        raise ValueError(f"The snapshot '{path}' is truncated")
+    with file.open_binary(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # Check the header
+    magic, version, segment = struct.unpack_from(">4sHQ", data)
+    if magic != WAL_SNAPSHOT_MAGIC or version != WAL_SNAPSHOT_VER:
+        data.close()
+        raise ValueError(f"The snapshot '{path}' has an unknown format")
+
+    # Return the snapshot and the segment
+    return memoryview(data)[WAL_SNAPSHOT_HEADER_SIZE:], segment
+
+
+# Write snapshot (writes to a temporary file and replaces the old snapshot)
+def write_snapshot(path: str, snapshot: bytes, segment: int) -> None:
+    with file.open_binary(f"{path}.tmp", "wb") as f:
+        f.write(struct.pack(">4sHQ", WAL_SNAPSHOT_MAGIC, WAL_SNAPSHOT_VER, segment))
+        f.write(snapshot)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+    sync_dir(file.directory(path))
+
+
+# Sync directory (makes created, renamed and deleted files durable, not supported on windows)
+def sync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)